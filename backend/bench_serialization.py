@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Per-request CPU cost of serializing a 1000-quote listing.
+
+Compares the response_model path FastAPI takes for `return quotes`
+(validate against List[Quote], dump_python(mode="json"), json.dumps) with the
+FastJSONResponse path the list endpoints now use.
+
+Usage (from backend/): python bench_serialization.py [--quotes 1000] [--items 8] [--rounds 20]
+No database is needed; documents are synthesized in the shape create_quote stores.
+"""
+import argparse
+import os
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import List
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'bench')
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+import server
+
+
+def make_quotes(count: int, items: int) -> List[dict]:
+    now = datetime.now(timezone.utc)
+    quotes = []
+    for n in range(count):
+        quote_items = [{
+            "product_id": str(uuid.uuid4()),
+            "product_name": f"Ürün {i}",
+            "product_code": f"P-{i:04d}",
+            "product_image": f"/api/images/{uuid.uuid4().hex * 2}",
+            "unit": "Metre",
+            "quantity": 12.5,
+            "unit_price": 4.75,
+            "subtotal": 59.375,
+            "note": None,
+        } for i in range(items)]
+        quotes.append({
+            "id": str(uuid.uuid4()),
+            "user_id": "bench",
+            "quote_number": f"FT-{n + 1:05d}",
+            "quote_date": now,
+            "validity_date": now + timedelta(days=30),
+            "customer_name": "Müşteri A.Ş.",
+            "customer_email": "musteri@example.com",
+            "customer_phone": "+90 555 000 00 00",
+            "currency": "EUR",
+            "items": quote_items,
+            "subtotal": 475.0,
+            "discount_type": "percentage",
+            "discount_value": 5.0,
+            "discount_amount": 23.75,
+            "vat_rate": 20.0,
+            "vat_amount": 90.25,
+            "total": 541.5,
+            "notes": None,
+            "created_at": now,
+        })
+    return quotes
+
+
+def response_model_path(adapter: TypeAdapter, quotes: List[dict]) -> bytes:
+    validated = adapter.validate_python(quotes)
+    return JSONResponse(adapter.dump_python(validated, mode="json")).body
+
+
+def fast_path(quotes: List[dict]) -> bytes:
+    return server.FastJSONResponse(quotes).body
+
+
+def measure(label: str, fn, rounds: int):
+    fn()  # warm up
+    started = time.process_time()
+    for _ in range(rounds):
+        body = fn()
+    per_request = (time.process_time() - started) / rounds * 1000
+    print(f"{label:<22} {per_request:8.2f} ms CPU/request  ({len(body) / 1024:.0f} KiB body)")
+    return per_request
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quotes', type=int, default=1000)
+    parser.add_argument('--items', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    quotes = make_quotes(args.quotes, args.items)
+    adapter = TypeAdapter(List[server.Quote])
+    print(f"{args.quotes} quotes x {args.items} items, {args.rounds} rounds, orjson={'yes' if server.orjson else 'no'}")
+    before = measure("response_model (before)", lambda: response_model_path(adapter, quotes), args.rounds)
+    after = measure("FastJSONResponse (after)", lambda: fast_path(quotes), args.rounds)
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
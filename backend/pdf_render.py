@@ -0,0 +1,333 @@
+"""
+Quote PDF rendering.
+
+Kept apart from server.py so PDF worker processes (spawn context) import only
+ReportLab and this module rather than the whole API app.
+"""
+import base64
+import io
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.enums import TA_LEFT, TA_RIGHT, TA_CENTER
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as RLImage
+from reportlab.lib import colors
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+# PDF rendering
+DEFAULT_THEME_COLOR = '#4F46E5'
+PDF_FONT_FILES = {
+    'DejaVuSans': '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    'DejaVuSans-Bold': '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
+}
+
+class PDFRenderContext:
+    """
+    Process-wide ReportLab state for quote PDFs.
+    Fonts are parsed once, paragraph and table styles are compiled once per theme color.
+    """
+
+    def __init__(self):
+        self.font_name, self.font_bold = self._register_fonts()
+        self._sample_styles = getSampleStyleSheet()
+        self._themes = {}
+        self._lock = threading.Lock()
+        self.info_table_style = TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), self.font_name),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#6b7280')),
+            ('TEXTCOLOR', (2, 0), (2, -1), colors.HexColor('#6b7280')),
+            ('TEXTCOLOR', (1, 0), (1, -1), colors.HexColor('#111827')),
+            ('TEXTCOLOR', (3, 0), (3, -1), colors.HexColor('#111827')),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ])
+        self.header_table_style = TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('ALIGN', (0, 0), (0, 0), 'LEFT'),
+            ('ALIGN', (1, 0), (1, 0), 'LEFT'),
+            ('LEFTPADDING', (1, 0), (1, 0), 20),
+        ])
+
+    @staticmethod
+    def _register_fonts():
+        # Register Turkish-compatible fonts
+        try:
+            for name, path in PDF_FONT_FILES.items():
+                if name not in pdfmetrics.getRegisteredFontNames():
+                    pdfmetrics.registerFont(TTFont(name, path))
+            return 'DejaVuSans', 'DejaVuSans-Bold'
+        except Exception as e:
+            # Fallback to Helvetica if DejaVu not available
+            logging.getLogger(__name__).warning(f"DejaVu fonts unavailable, falling back to Helvetica: {e}")
+            return 'Helvetica', 'Helvetica-Bold'
+
+    def theme(self, theme_color: str) -> dict:
+        themed = self._themes.get(theme_color)
+        if themed is None:
+            with self._lock:
+                themed = self._themes.get(theme_color)
+                if themed is None:
+                    themed = self._build_theme(theme_color)
+                    self._themes[theme_color] = themed
+        return themed
+
+    def _build_theme(self, theme_color: str) -> dict:
+        styles = self._sample_styles
+        color = colors.HexColor(theme_color)
+        title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontName=self.font_bold, fontSize=20, textColor=color, spaceAfter=12)
+        return {
+            'title': title_style,
+            'heading': ParagraphStyle('CustomHeading', parent=styles['Heading2'], fontName=self.font_bold, fontSize=12, textColor=colors.HexColor('#374151'), spaceAfter=6),
+            'normal': ParagraphStyle('CustomNormal', parent=styles['Normal'], fontName=self.font_name, fontSize=9, textColor=colors.HexColor('#4b5563')),
+            'quote_title': ParagraphStyle('QuoteTitle', parent=title_style, fontSize=24, textColor=color, alignment=1, spaceAfter=20),
+            'group_header': ParagraphStyle('GroupHeader', parent=styles['Heading3'], fontSize=11, textColor=color,
+                                           fontName=self.font_bold, spaceBefore=8, spaceAfter=4, leftIndent=0),
+            'items_table': TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), color),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (1, 0), (1, -1), 'CENTER'),   # Birim column centered
+                ('ALIGN', (2, 0), (2, -1), 'CENTER'),   # Koli/PK column centered
+                ('ALIGN', (3, 0), (3, -1), 'RIGHT'),    # Birim Fiyat column right
+                ('ALIGN', (4, 0), (4, -1), 'CENTER'),   # Miktar column centered
+                ('ALIGN', (5, 0), (5, -1), 'RIGHT'),    # Tutar column right aligned
+                ('FONTNAME', (0, 0), (-1, 0), self.font_bold),
+                ('FONTSIZE', (0, 0), (-1, 0), 8),       # Header font size
+                ('FONTNAME', (0, 1), (-1, -1), self.font_name),
+                ('FONTSIZE', (0, 1), (-1, -1), 7),      # Content font size
+                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f9fafb')]),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#d1d5db')),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ('TOPPADDING', (0, 0), (-1, -1), 8),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+                ('LEFTPADDING', (0, 0), (-1, -1), 4),
+                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+                # Allow text wrapping in product name column for long names
+                ('WORDWRAP', (0, 1), (0, -1), 'CJK'),
+            ]),
+            'totals_table': TableStyle([
+                ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+                ('FONTNAME', (0, 0), (-1, 2), self.font_name),
+                ('FONTSIZE', (0, 0), (-1, 2), 9),
+                ('FONTNAME', (0, 3), (-1, 3), self.font_bold),
+                ('FONTSIZE', (0, 3), (-1, 3), 11),
+                ('TEXTCOLOR', (0, 3), (-1, 3), color),
+                ('LINEABOVE', (0, 3), (-1, 3), 1.5, color),
+                ('TOPPADDING', (0, 0), (-1, -1), 6),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ]),
+        }
+
+    def warm_up(self, theme_colors=(DEFAULT_THEME_COLOR,)):
+        # Render a throwaway quote so font subsetting and layout caches are hot before the first request
+        now = datetime.now(timezone.utc)
+        sample_quote = {
+            'quote_number': 'FT-00000', 'quote_date': now, 'validity_date': now,
+            'customer_name': 'Müşteri', 'customer_email': '-', 'currency': 'EUR',
+            'items': [{'product_id': '-', 'product_name': 'Ürün', 'unit': 'Adet', 'quantity': 1, 'unit_price': 1.0, 'subtotal': 1.0}],
+            'subtotal': 1.0, 'discount_amount': 0, 'vat_rate': 0, 'vat_amount': 0, 'total': 1.0,
+        }
+        for theme_color in theme_colors:
+            render_quote_pdf(sample_quote, {'company_name': 'Firma Adı', 'theme_color': theme_color}, {}, context=self)
+
+_pdf_context = None
+_pdf_context_lock = threading.Lock()
+
+def get_pdf_context() -> PDFRenderContext:
+    global _pdf_context
+    if _pdf_context is None:
+        with _pdf_context_lock:
+            if _pdf_context is None:
+                _pdf_context = PDFRenderContext()
+    return _pdf_context
+
+def render_quote_pdf(quote: dict, settings: Optional[dict], product_groups: dict, context: Optional[PDFRenderContext] = None) -> bytes:
+    """Render a quote to PDF bytes. product_groups maps product_id to its group name."""
+    ctx = context or get_pdf_context()
+    font_name = ctx.font_name
+
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=2*cm, bottomMargin=2*cm, leftMargin=2*cm, rightMargin=2*cm)
+    story = []
+
+    # Get theme color from settings (hex color format)
+    theme_color = settings.get('theme_color', DEFAULT_THEME_COLOR) if settings else DEFAULT_THEME_COLOR
+    styles = ctx.theme(theme_color)
+    title_style = styles['title']
+    heading_style = styles['heading']
+    normal_style = styles['normal']
+
+    # Logo and company info header
+    # Company info section
+    if settings:
+        company_info = []
+        if settings.get('company_name'):
+            company_info.append([Paragraph(settings['company_name'], title_style)])
+        if settings.get('company_address'):
+            company_info.append([Paragraph(settings['company_address'], normal_style)])
+
+        contact_info = []
+        if settings.get('company_phone'):
+            contact_info.append(f"Tel: {settings['company_phone']}")
+        if settings.get('company_email'):
+            contact_info.append(f"E-posta: {settings['company_email']}")
+        if settings.get('company_website'):
+            contact_info.append(f"Web: {settings['company_website']}")
+
+        if contact_info:
+            company_info.append([Paragraph(" | ".join(contact_info), normal_style)])
+
+        # Create header layout
+        if settings.get('logo_jpeg') or settings.get('logo'):
+            try:
+                # logo_jpeg is prepared by the settings cache; raw settings documents still carry base64 'logo'
+                logo_data = settings.get('logo_jpeg') or base64.b64decode(settings['logo'].split(',')[1] if ',' in settings['logo'] else settings['logo'])
+                logo_img = RLImage(io.BytesIO(logo_data), width=4*cm, height=3*cm)
+
+                # Create header table with logo and company info side by side
+                header_table_data = [[logo_img, company_info]]
+                header_table = Table(header_table_data, colWidths=[5*cm, 11*cm])
+                header_table.setStyle(ctx.header_table_style)
+                story.append(header_table)
+            except:
+                # If logo fails, just add company info
+                for info in company_info:
+                    story.append(info[0])
+        else:
+            # No logo, just company info
+            for info in company_info:
+                story.append(info[0])
+    else:
+        story.append(Paragraph("Firma Adı", title_style))
+
+    story.append(Spacer(1, 0.8*cm))
+
+    # Quote title
+    story.append(Paragraph("FİYAT TEKLİFİ", styles['quote_title']))
+    story.append(Spacer(1, 0.5*cm))
+
+    # Quote info
+    info_data = [
+        ["Teklif No:", quote['quote_number'], "Müşteri:", quote['customer_name']],
+        ["Tarih:", quote['quote_date'].strftime('%d.%m.%Y'), "E-posta:", quote['customer_email']],
+        ["Geçerlilik:", quote['validity_date'].strftime('%d.%m.%Y'), "Telefon:", quote.get('customer_phone', '-')]
+    ]
+
+    info_table = Table(info_data, colWidths=[3*cm, 5*cm, 3*cm, 5*cm])
+    info_table.setStyle(ctx.info_table_style)
+    story.append(info_table)
+    story.append(Spacer(1, 0.5*cm))
+
+    # Group items by product group
+    grouped_items = {}
+    for item in quote['items']:
+        group_name = product_groups.get(item['product_id'])
+
+        if group_name:
+            if group_name not in grouped_items:
+                grouped_items[group_name] = []
+            grouped_items[group_name].append(item)
+        else:
+            if 'Diğer' not in grouped_items:
+                grouped_items['Diğer'] = []
+            grouped_items['Diğer'].append(item)
+
+    # Add items grouped by group
+    for group_name in sorted(grouped_items.keys()):
+        # Add group header as separate paragraph
+        group_header = Paragraph(f"<b>▸ {group_name}</b>", styles['group_header'])
+        story.append(group_header)
+
+        # Create table for this group
+        table_data = [['Ürün Adı', 'Birim', 'Koli/PK', 'Birim Fiyat', 'Miktar', 'Tutar']]
+
+        # Add items in this group
+        for item in grouped_items[group_name]:
+            # Calculate package count and actual quantity
+            package_count = "-"
+            actual_quantity = item['quantity']
+            unit = item['unit']
+
+            # Format quantity display and extract package count
+            if item.get('display_text'):
+                # Example: "2 paket (100 m²)" or "2 Paket (100 Metre)"
+                display_text_lower = item['display_text'].lower()
+
+                if 'paket' in display_text_lower:
+                    # Extract package count
+                    package_part = item['display_text'].split('paket')[0].strip()
+                    package_part = package_part.split('Paket')[0].strip()  # Case-insensitive
+                    try:
+                        package_count = str(int(float(package_part)))
+                    except Exception as e:
+                        logging.getLogger(__name__).debug(f"Error parsing package count from '{item['display_text']}': {e}")
+                        package_count = package_part if package_part else "-"
+
+                    # Extract calculated amount in parentheses
+                    if '(' in item['display_text'] and ')' in item['display_text']:
+                        calc_part = item['display_text'].split('(')[1].split(')')[0]
+                        actual_quantity = calc_part.split(' ')[0]
+                    else:
+                        actual_quantity = str(item['quantity'])
+                else:
+                    # No package-based, just show quantity
+                    actual_quantity = str(item['quantity'])
+            else:
+                # No display_text, just show quantity
+                actual_quantity = str(item['quantity'])
+
+            table_data.append([
+                item['product_name'],  # Full product name, no truncation
+                unit,
+                package_count,  # Changed from package_info to package_count
+                f"{item['unit_price']:.2f}",
+                actual_quantity,
+                f"{item['subtotal']:.2f} {quote['currency']}"
+            ])
+
+        # Create table for this group
+        items_table = Table(table_data, colWidths=[7*cm, 1.8*cm, 1.8*cm, 2.2*cm, 2.2*cm, 2.5*cm])
+        items_table.setStyle(styles['items_table'])
+        story.append(items_table)
+        story.append(Spacer(1, 0.2*cm))
+
+    # Totals
+    totals_data = [
+        ['Ara Toplam:', f"{quote['subtotal']:.2f} {quote['currency']}"]
+    ]
+
+    # İndirim varsa ekle
+    if quote['discount_amount'] > 0:
+        totals_data.append(['İndirim:', f"-{quote['discount_amount']:.2f} {quote['currency']}"])
+
+    # KDV varsa ekle
+    if quote['vat_amount'] > 0:
+        totals_data.append(['KDV (%{:.0f})'.format(quote['vat_rate']), f"{quote['vat_amount']:.2f} {quote['currency']}"])
+
+    totals_data.append(['GENEL TOPLAM:', f"{quote['total']:.2f} {quote['currency']}"])
+
+    totals_table = Table(totals_data, colWidths=[13*cm, 3*cm])
+    totals_table.setStyle(styles['totals_table'])
+    story.append(totals_table)
+
+    if quote.get('notes'):
+        story.append(Spacer(1, 0.5*cm))
+        story.append(Paragraph("<b>Notlar:</b>", heading_style))
+        story.append(Paragraph(quote['notes'], normal_style))
+
+    doc.build(story)
+    return buffer.getvalue()
+
+
+# PDF worker process hooks
+def init_worker():
+    get_pdf_context().warm_up()
+
+def worker_ready() -> int:
+    # No-op task; submitting one per worker makes the pool spawn (and warm) every process up front
+    return 0
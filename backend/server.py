@@ -1,41 +1,71 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File, Request
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File, Request, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import StreamingResponse, Response, HTMLResponse
+from fastapi.responses import StreamingResponse, Response, HTMLResponse, FileResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel, ReturnDocument, UpdateOne
+from bson import json_util
+from pymongo.errors import DuplicateKeyError, OperationFailure
 import os
 import logging
+import asyncio
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Optional, Literal
 import uuid
 from datetime import datetime, timezone, timedelta
+from zoneinfo import ZoneInfo
 import jwt
 from passlib.context import CryptContext
 import base64
+import re
+import unicodedata
+import hashlib
+import json
 import io
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import cm
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_LEFT, TA_RIGHT, TA_CENTER
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as RLImage
-from reportlab.lib import colors
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+import time
+import heapq
+from collections import OrderedDict
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from urllib.request import urlopen
+from urllib.parse import urlsplit
+from email.utils import parsedate_to_datetime
+from PIL import Image as PILImage
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 import httpx
+import html
+import anyio
+
+import pdf_render
+from pdf_render import get_pdf_context, render_quote_pdf
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, tz_aware=True)
 db = client[os.environ['DB_NAME']]
 
 # Security
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Changing BCRYPT_ROUNDS makes existing hashes "need update"; they are rehashed on the next successful login
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 SECRET_KEY = os.environ.get('JWT_SECRET', 'your-secret-key-change-in-production')
 ALGORITHM = "HS256"
 security = HTTPBearer()
@@ -169,9 +199,31 @@ class Product(BaseModel):
     package_length: Optional[float] = None
     package_count: Optional[int] = None
     description: Optional[str] = None
-    image: Optional[str] = None  # base64 encoded
+    image: Optional[str] = None  # /api/images/<sha256> reference into the image store
+    image_thumbnail: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class ProductListItem(BaseModel):
+    # Product as returned by the list endpoint; every field is optional so ?fields= projections validate
+    model_config = ConfigDict(extra="ignore")
+    id: Optional[str] = None
+    code: Optional[str] = None
+    name: Optional[str] = None
+    group: Optional[str] = None
+    category: Optional[str] = None
+    unit: Optional[str] = None
+    unit_price: Optional[float] = None
+    currency: Optional[str] = None
+    is_package_based: Optional[bool] = None
+    package_kg: Optional[float] = None
+    package_m2: Optional[float] = None
+    package_length: Optional[float] = None
+    package_count: Optional[int] = None
+    description: Optional[str] = None
+    image: Optional[str] = None
+    image_thumbnail: Optional[str] = None
+    created_at: Optional[datetime] = None
+
 class ProductCreate(BaseModel):
     code: str
     name: str
@@ -266,12 +318,138 @@ class SettingsUpdate(BaseModel):
     # UI Theme (light/dark mode)
     ui_theme: Optional[Literal["light", "dark"]] = None
 
+# Storage codec: dates are stored as native BSON datetimes (UTC).
+# Documents written before that still hold ISO strings until migrate_datetime_fields() rewrites them.
+DATETIME_FIELDS = {
+    "users": ("created_at",),
+    "roles": ("created_at",),
+    "categories": ("created_at",),
+    "groups": ("created_at",),
+    "products": ("created_at",),
+    "customers": ("created_at",),
+    "contact_channels": ("created_at",),
+    "reminders": ("reminder_datetime", "created_at"),
+    "quotes": ("quote_date", "validity_date", "created_at"),
+    "settings": ("updated_at",),
+    "channel_sessions": ("updated_at",),
+}
+# Naive reminder times are the browser's local wall-clock time (tr-TR users), both in stored
+# documents and in create/update/filter input; everything else naive was UTC
+LEGACY_LOCAL_TIMEZONE = ZoneInfo(os.environ.get('LEGACY_LOCAL_TIMEZONE', 'Europe/Istanbul'))
+WALL_CLOCK_FIELDS = {("reminders", "reminder_datetime")}
+
+def to_utc(value: datetime, naive_tz=timezone.utc) -> datetime:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=naive_tz)
+    return value.astimezone(timezone.utc)
+
+def decode_datetimes(doc: dict, fields) -> dict:
+    # Only needed where Python code uses the values directly; response models parse strings on their own
+    for field in fields:
+        value = doc.get(field)
+        if isinstance(value, str):
+            doc[field] = to_utc(datetime.fromisoformat(value))
+    return doc
+
+async def migrate_datetime_fields(batch_size: int = 500):
+    # Online and resumable: each pass only matches documents that still hold strings
+    for collection, fields in DATETIME_FIELDS.items():
+        query = {"$or": [{field: {"$type": "string"}} for field in fields]}
+        unparseable = []
+        converted = 0
+        while True:
+            if unparseable:
+                query["_id"] = {"$nin": unparseable}
+            batch = await db[collection].find(query, {field: 1 for field in fields}).limit(batch_size).to_list(batch_size)
+            if not batch:
+                break
+            operations = []
+            for doc in batch:
+                updates = {}
+                for field in fields:
+                    value = doc.get(field)
+                    if not isinstance(value, str):
+                        continue
+                    naive_tz = LEGACY_LOCAL_TIMEZONE if (collection, field) in WALL_CLOCK_FIELDS else timezone.utc
+                    try:
+                        updates[field] = to_utc(datetime.fromisoformat(value), naive_tz)
+                    except ValueError:
+                        # Left as is and excluded from later passes
+                        logger.warning(f"Unparseable {collection}.{field} on {doc['_id']}: {value!r}")
+                        unparseable.append(doc['_id'])
+                if updates:
+                    operations.append(UpdateOne({"_id": doc['_id']}, {"$set": updates}))
+            if operations:
+                await db[collection].bulk_write(operations, ordered=False)
+                converted += len(operations)
+            # Yield between batches so request handling isn't starved
+            await asyncio.sleep(0)
+        if converted:
+            logger.info(f"Converted date strings to native datetimes in {converted} {collection} documents")
+
+# Fast JSON path for list endpoints.
+# Rows we read back from our own collections were validated on the way in, so list endpoints
+# return FastJSONResponse directly: FastAPI skips response_model validation for Response objects,
+# and orjson (when installed) serializes datetimes natively.
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat().replace('+00:00', 'Z')
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def fast_json_dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return fast_json_dumps(content)
+
 # Auth helpers
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+class PasswordHasher:
+    """
+    Runs bcrypt on a small dedicated thread pool (bcrypt releases the GIL) so hashing never stalls the event loop.
+    The pool size caps how many hashes run at once; extra calls queue.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._timings = {"hash": [0, 0.0, 0.0], "verify": [0, 0.0, 0.0]}  # count, total, max seconds
+
+    async def _run(self, op: str, fn, *args):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            elapsed = time.perf_counter() - started
+            timing = self._timings[op]
+            timing[0] += 1
+            timing[1] += elapsed
+            timing[2] = max(timing[2], elapsed)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str):
+        # Returns (valid, new_hash); new_hash is set when the stored hash uses an outdated cost
+        return await self._run("verify", pwd_context.verify_and_update, password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            op: {"count": count, "avg_ms": round(total / count * 1000, 1) if count else 0.0, "max_ms": round(peak * 1000, 1)}
+            for op, (count, total, peak) in self._timings.items()
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+password_hasher = PasswordHasher()
+
+async def hash_password(password: str) -> str:
+    return await password_hasher.hash(password)
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -280,18 +458,79 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# Authenticated-user cache: saves the users lookup on every request
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 30))  # seconds
+USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES', 10000))
+
+class UserCache:
+    """
+    Bounded LRU of {id, username, role} keyed by username, with a short TTL.
+    Admin endpoints that change a user invalidate it explicitly; the TTL bounds staleness from anything else.
+    """
+
+    def __init__(self, ttl: float = USER_CACHE_TTL, max_entries: int = USER_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._usernames_by_id = {}
+
+    def get(self, username: str) -> Optional[dict]:
+        entry = self._entries.get(username)
+        if entry is not None:
+            expires_at, user = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(username)
+                self.hits += 1
+                return user
+            self._remove(username)
+        self.misses += 1
+        return None
+
+    def put(self, user: dict):
+        username = user['username']
+        self._remove(username)
+        self._entries[username] = (time.monotonic() + self.ttl, user)
+        self._usernames_by_id[user['id']] = username
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate(self, username: Optional[str] = None, user_id: Optional[str] = None):
+        if username is None and user_id is not None:
+            username = self._usernames_by_id.get(user_id)
+        if username is not None:
+            self._remove(username)
+
+    def _remove(self, username: str):
+        entry = self._entries.pop(username, None)
+        if entry is not None:
+            self._usernames_by_id.pop(entry[1]['id'], None)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+user_cache = UserCache()
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return await user_from_token(credentials.credentials)
+
+async def user_from_token(token: str) -> dict:
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             raise HTTPException(status_code=401, detail="Invalid token")
         
-        user = await db.users.find_one({"username": username}, {"_id": 0})
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
+        current_user = user_cache.get(username)
+        if current_user is None:
+            user = await db.users.find_one({"username": username}, {"_id": 0, "id": 1, "role": 1})
+            if not user:
+                raise HTTPException(status_code=401, detail="User not found")
+            current_user = {"id": user.get("id"), "username": username, "role": user.get("role", "user")}
+            user_cache.put(current_user)
         
-        return {"id": user.get("id"), "username": username, "role": user.get("role", "user")}
+        return dict(current_user)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
@@ -315,11 +554,10 @@ async def register(user: UserRegister):
     
     user_obj = User(
         username=user.username,
-        password_hash=hash_password(user.password),
+        password_hash=await hash_password(user.password),
         role=role
     )
     doc = user_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.users.insert_one(doc)
     
     access_token = create_access_token(data={"sub": user.username})
@@ -328,8 +566,14 @@ async def register(user: UserRegister):
 @api_router.post("/auth/login", response_model=Token)
 async def login(user: UserLogin):
     db_user = await db.users.find_one({"username": user.username}, {"_id": 0})
-    if not db_user or not verify_password(user.password, db_user["password_hash"]):
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Invalid username or password")
+    valid, new_hash = await password_hasher.verify_and_update(user.password, db_user["password_hash"])
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid username or password")
+    if new_hash:
+        # BCRYPT_ROUNDS changed since this hash was made
+        await db.users.update_one({"id": db_user["id"]}, {"$set": {"password_hash": new_hash}})
     
     access_token = create_access_token(data={"sub": user.username})
     return Token(access_token=access_token, token_type="bearer", role=db_user.get("role", "user"))
@@ -339,10 +583,7 @@ async def login(user: UserLogin):
 @api_router.get("/roles", response_model=List[Role])
 async def get_roles(current_user: dict = Depends(get_admin_user)):
     roles = await db.roles.find({}, {"_id": 0}).to_list(1000)
-    for role in roles:
-        if isinstance(role['created_at'], str):
-            role['created_at'] = datetime.fromisoformat(role['created_at'])
-    return roles
+    return FastJSONResponse(roles)
 
 @api_router.post("/roles", response_model=Role)
 async def create_role(role: RoleCreate, current_user: dict = Depends(get_admin_user)):
@@ -353,7 +594,6 @@ async def create_role(role: RoleCreate, current_user: dict = Depends(get_admin_u
     
     role_obj = Role(**role.model_dump())
     doc = role_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.roles.insert_one(doc)
     return role_obj
 
@@ -373,10 +613,7 @@ async def delete_role(role_id: str, current_user: dict = Depends(get_admin_user)
 @api_router.get("/categories", response_model=List[Category])
 async def get_categories(current_user: dict = Depends(get_current_user)):
     categories = await db.categories.find({}, {"_id": 0}).to_list(1000)
-    for cat in categories:
-        if isinstance(cat['created_at'], str):
-            cat['created_at'] = datetime.fromisoformat(cat['created_at'])
-    return categories
+    return FastJSONResponse(categories)
 
 @api_router.post("/categories", response_model=Category)
 async def create_category(category: CategoryCreate, current_user: dict = Depends(get_admin_user)):
@@ -387,25 +624,23 @@ async def create_category(category: CategoryCreate, current_user: dict = Depends
     
     cat_obj = Category(name=category.name)
     doc = cat_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.categories.insert_one(doc)
     return cat_obj
 
 @api_router.put("/categories/{category_id}", response_model=Category)
 async def update_category(category_id: str, category: CategoryCreate, current_user: dict = Depends(get_admin_user)):
-    existing = await db.categories.find_one({"id": category_id}, {"_id": 0})
-    if not existing:
-        raise HTTPException(status_code=404, detail="Category not found")
-    
-    # Check if new name already exists (excluding current category)
-    name_exists = await db.categories.find_one({"name": category.name, "id": {"$ne": category_id}}, {"_id": 0})
-    if name_exists:
+    # Name uniqueness comes from the name_unique index
+    try:
+        updated = await db.categories.find_one_and_update(
+            {"id": category_id},
+            {"$set": {"name": category.name}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
         raise HTTPException(status_code=400, detail="Category name already exists")
-    
-    await db.categories.update_one({"id": category_id}, {"$set": {"name": category.name}})
-    updated = await db.categories.find_one({"id": category_id}, {"_id": 0})
-    if isinstance(updated['created_at'], str):
-        updated['created_at'] = datetime.fromisoformat(updated['created_at'])
+    if not updated:
+        raise HTTPException(status_code=404, detail="Category not found")
     return updated
 
 @api_router.delete("/categories/{category_id}")
@@ -419,10 +654,7 @@ async def delete_category(category_id: str, current_user: dict = Depends(get_adm
 @api_router.get("/groups", response_model=List[Group])
 async def get_groups(current_user: dict = Depends(get_current_user)):
     groups = await db.groups.find({}, {"_id": 0}).to_list(1000)
-    for grp in groups:
-        if isinstance(grp['created_at'], str):
-            grp['created_at'] = datetime.fromisoformat(grp['created_at'])
-    return groups
+    return FastJSONResponse(groups)
 
 @api_router.post("/groups", response_model=Group)
 async def create_group(group: GroupCreate, current_user: dict = Depends(get_admin_user)):
@@ -434,26 +666,25 @@ async def create_group(group: GroupCreate, current_user: dict = Depends(get_admi
     doc = {
         "id": str(uuid.uuid4()),
         "name": group.name,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     }
     await db.groups.insert_one(doc)
     return Group(**doc)
 
 @api_router.put("/groups/{group_id}", response_model=Group)
 async def update_group(group_id: str, group: GroupCreate, current_user: dict = Depends(get_admin_user)):
-    existing = await db.groups.find_one({"id": group_id}, {"_id": 0})
-    if not existing:
-        raise HTTPException(status_code=404, detail="Group not found")
-    
-    # Check if new name already exists (excluding current group)
-    name_exists = await db.groups.find_one({"name": group.name, "id": {"$ne": group_id}}, {"_id": 0})
-    if name_exists:
+    # Name uniqueness comes from the name_unique index
+    try:
+        updated = await db.groups.find_one_and_update(
+            {"id": group_id},
+            {"$set": {"name": group.name}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
         raise HTTPException(status_code=400, detail="Group name already exists")
-    
-    await db.groups.update_one({"id": group_id}, {"$set": {"name": group.name}})
-    updated = await db.groups.find_one({"id": group_id}, {"_id": 0})
-    if isinstance(updated['created_at'], str):
-        updated['created_at'] = datetime.fromisoformat(updated['created_at'])
+    if not updated:
+        raise HTTPException(status_code=404, detail="Group not found")
     return updated
 
 @api_router.delete("/groups/{group_id}")
@@ -468,18 +699,209 @@ class UserCreateByAdmin(BaseModel):
     password: str
     role: Literal["admin", "user"] = "user"
 
+# Reminder scheduler: due reminders are pushed to connected clients over Server-Sent Events.
+# Pending reminders due within REMINDER_HORIZON sit in a min-heap; the heap is reloaded from
+# the (is_completed, reminder_datetime) index every REMINDER_RELOAD_INTERVAL seconds, which
+# also picks up reminders written by other worker processes. The endpoints below update it directly.
+REMINDER_HORIZON = float(os.environ.get('REMINDER_HORIZON', 600))  # seconds
+REMINDER_RELOAD_INTERVAL = float(os.environ.get('REMINDER_RELOAD_INTERVAL', 60))  # seconds
+REMINDER_STARTUP_GRACE = float(os.environ.get('REMINDER_STARTUP_GRACE', 60))  # seconds
+REMINDER_STREAM_HEARTBEAT = 15  # seconds
+REMINDER_EVENT_FIELDS = ('id', 'title', 'description', 'reminder_datetime')
+
+class ReminderScheduler:
+    """
+    Min-heap of (due time, reminder id). Reschedules and cancellations are lazy: the heap entry
+    stays and is skipped when it no longer matches _scheduled.
+    """
+
+    def __init__(self, horizon: float, reload_interval: float):
+        self.horizon = horizon
+        self.reload_interval = reload_interval
+        self._heap = []
+        self._scheduled = {}  # reminder id -> (due timestamp, user_id, event payload)
+        self._subscribers = {}  # user_id -> set of asyncio.Queue
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._next_load = 0.0
+        self._last_load = None
+        self._fired = {}  # reminder id -> due timestamp, for reminders fired since the last load
+        self.delivered = 0
+
+    def schedule(self, reminder: dict):
+        due = to_utc(reminder['reminder_datetime']).timestamp()
+        if reminder.get('is_completed') or due > time.time() + self.horizon:
+            # Outside the window: picked up by a later reload
+            self.cancel(reminder['id'])
+            return
+        payload = {field: reminder.get(field) for field in REMINDER_EVENT_FIELDS}
+        self._scheduled[reminder['id']] = (due, reminder['user_id'], payload)
+        heapq.heappush(self._heap, (due, reminder['id']))
+        self._wakeup.set()
+
+    def cancel(self, reminder_id: str):
+        self._scheduled.pop(reminder_id, None)
+
+    async def load(self, since: Optional[datetime] = None):
+        # since: start of the window; reloads pass the previous load time so reminders created
+        # elsewhere that came due in between are still delivered
+        now = datetime.now(timezone.utc)
+        since = since or now
+        self._fired = {rid: due for rid, due in self._fired.items() if due > since.timestamp()}
+        cursor = db.reminders.find(
+            {
+                "is_completed": False,
+                "reminder_datetime": {"$gt": since, "$lte": now + timedelta(seconds=self.horizon)},
+            },
+            {"_id": 0, "user_id": 1, **{field: 1 for field in REMINDER_EVENT_FIELDS}},
+        ).sort("reminder_datetime", 1)
+        async for reminder in cursor:
+            due = to_utc(reminder['reminder_datetime']).timestamp()
+            if self._fired.get(reminder['id']) == due:
+                continue  # already delivered by this process
+            entry = self._scheduled.get(reminder['id'])
+            if entry is None or entry[0] != due:
+                self.schedule(reminder)
+        self._last_load = now
+        self._next_load = time.time() + self.reload_interval
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=100)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def _fire_due(self):
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            due, reminder_id = heapq.heappop(self._heap)
+            entry = self._scheduled.get(reminder_id)
+            if entry is None or entry[0] != due:
+                continue  # cancelled or rescheduled
+            del self._scheduled[reminder_id]
+            self._fired[reminder_id] = due
+            _, user_id, payload = entry
+            for queue in self._subscribers.get(user_id, ()):
+                try:
+                    queue.put_nowait(payload)
+                    self.delivered += 1
+                except asyncio.QueueFull:
+                    logger.warning(f"Dropping reminder {reminder_id} for a slow subscriber of {user_id}")
+
+    async def _run(self):
+        while True:
+            self._fire_due()
+            if time.time() >= self._next_load:
+                try:
+                    await self.load(since=self._last_load)
+                except Exception as e:
+                    logger.error(f"Reminder reload failed: {e}")
+                    self._next_load = time.time() + self.reload_interval
+            next_due = self._heap[0][0] if self._heap else float('inf')
+            delay = max(0.0, min(next_due, self._next_load) - time.time())
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self):
+        if self._task is None:
+            # Reminders that came due while the server was down are still announced within the grace period
+            await self.load(since=datetime.now(timezone.utc) - timedelta(seconds=REMINDER_STARTUP_GRACE))
+            self._task = spawn_background(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "scheduled": len(self._scheduled),
+            "heap_size": len(self._heap),
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            "delivered": self.delivered,
+        }
+
+reminder_scheduler = ReminderScheduler(REMINDER_HORIZON, REMINDER_RELOAD_INTERVAL)
+
+@api_router.get("/reminders/stream")
+async def stream_reminders(token: str):
+    """
+    Server-Sent Events: one "reminder" event per reminder as it comes due.
+    EventSource can't send an Authorization header, so the JWT comes as ?token=.
+    """
+    current_user = await user_from_token(token)
+    user_id = current_user["username"]
+    queue = reminder_scheduler.subscribe(user_id)
+
+    async def unsubscribe():
+        # Also run as the response's background task: when the browser disconnects before the
+        # body starts, the generator's finally never runs. unsubscribe() is idempotent.
+        reminder_scheduler.unsubscribe(user_id, queue)
+
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    payload = await asyncio.wait_for(queue.get(), timeout=REMINDER_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: reminder\ndata: {fast_json_dumps(payload).decode('utf-8')}\n\n"
+        finally:
+            await unsubscribe()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(unsubscribe),
+    )
+
+@api_router.get("/admin/reminder-scheduler")
+async def get_reminder_scheduler_stats(current_user: dict = Depends(get_admin_user)):
+    return reminder_scheduler.stats()
+
 # Reminders endpoints (User specific)
+REMINDER_PAGE_MAX = 1000
+
 @api_router.get("/reminders", response_model=List[Reminder])
-async def get_reminders(current_user: dict = Depends(get_current_user)):
-    reminders = await db.reminders.find({"user_id": current_user["username"]}, {"_id": 0}).to_list(1000)
-    for reminder in reminders:
-        if isinstance(reminder['created_at'], str):
-            reminder['created_at'] = datetime.fromisoformat(reminder['created_at'])
-        if isinstance(reminder['reminder_datetime'], str):
-            reminder['reminder_datetime'] = datetime.fromisoformat(reminder['reminder_datetime'])
-    # Sort by reminder_datetime
-    reminders.sort(key=lambda x: x.get('reminder_datetime'))
-    return reminders
+async def get_reminders(
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    reminder_status: Optional[Literal["pending", "completed", "overdue"]] = Query(None, alias="status"),
+    limit: int = Query(REMINDER_PAGE_MAX, ge=1, le=REMINDER_PAGE_MAX),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Sorted by reminder_datetime. pending = not completed, overdue = not completed and already due.
+    Next 20 upcoming: ?status=pending&from=<now>&limit=20
+    """
+    query = {"user_id": current_user["username"]}
+    if reminder_status:
+        # Served by the (user_id, is_completed, reminder_datetime) index
+        query['is_completed'] = reminder_status == "completed"
+    window = {}
+    if date_from:
+        window['$gte'] = to_utc(date_from, LEGACY_LOCAL_TIMEZONE)
+    if date_to:
+        window['$lte'] = to_utc(date_to, LEGACY_LOCAL_TIMEZONE)
+    if reminder_status == "overdue":
+        window['$lt'] = datetime.now(timezone.utc)
+    if window:
+        query['reminder_datetime'] = window
+    reminders = await db.reminders.find(query, {"_id": 0}) \
+        .sort("reminder_datetime", 1).limit(limit).to_list(limit)
+    return FastJSONResponse(reminders)
 
 @api_router.post("/reminders", response_model=Reminder)
 async def create_reminder(reminder: ReminderCreate, current_user: dict = Depends(get_current_user)):
@@ -487,33 +909,30 @@ async def create_reminder(reminder: ReminderCreate, current_user: dict = Depends
         "id": str(uuid.uuid4()),
         "title": reminder.title,
         "description": reminder.description,
-        "reminder_datetime": reminder.reminder_datetime.isoformat(),
+        "reminder_datetime": to_utc(reminder.reminder_datetime, LEGACY_LOCAL_TIMEZONE),
         "user_id": current_user["username"],
         "is_completed": False,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     }
     await db.reminders.insert_one(doc)
+    reminder_scheduler.schedule(doc)
     return Reminder(**doc)
 
 @api_router.put("/reminders/{reminder_id}", response_model=Reminder)
 async def update_reminder(reminder_id: str, reminder: ReminderCreate, current_user: dict = Depends(get_current_user)):
-    existing = await db.reminders.find_one({"id": reminder_id, "user_id": current_user["username"]}, {"_id": 0})
-    if not existing:
-        raise HTTPException(status_code=404, detail="Reminder not found")
-    
-    await db.reminders.update_one(
-        {"id": reminder_id},
+    updated = await db.reminders.find_one_and_update(
+        {"id": reminder_id, "user_id": current_user["username"]},
         {"$set": {
             "title": reminder.title,
             "description": reminder.description,
-            "reminder_datetime": reminder.reminder_datetime.isoformat()
-        }}
+            "reminder_datetime": to_utc(reminder.reminder_datetime, LEGACY_LOCAL_TIMEZONE)
+        }},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER,
     )
-    updated = await db.reminders.find_one({"id": reminder_id}, {"_id": 0})
-    if isinstance(updated['created_at'], str):
-        updated['created_at'] = datetime.fromisoformat(updated['created_at'])
-    if isinstance(updated['reminder_datetime'], str):
-        updated['reminder_datetime'] = datetime.fromisoformat(updated['reminder_datetime'])
+    if not updated:
+        raise HTTPException(status_code=404, detail="Reminder not found")
+    reminder_scheduler.schedule(updated)
     return updated
 
 @api_router.patch("/reminders/{reminder_id}/complete")
@@ -524,6 +943,7 @@ async def complete_reminder(reminder_id: str, current_user: dict = Depends(get_c
     )
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Reminder not found")
+    reminder_scheduler.cancel(reminder_id)
     return {"message": "Reminder marked as completed"}
 
 @api_router.delete("/reminders/{reminder_id}")
@@ -531,27 +951,24 @@ async def delete_reminder(reminder_id: str, current_user: dict = Depends(get_cur
     result = await db.reminders.delete_one({"id": reminder_id, "user_id": current_user["username"]})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Reminder not found")
+    reminder_scheduler.cancel(reminder_id)
     return {"message": "Reminder deleted successfully"}
 
 # Contact Channels endpoints (User specific)
 @api_router.get("/contact-channels", response_model=List[ContactChannel])
 async def get_contact_channels(current_user: dict = Depends(get_current_user)):
     channels = await db.contact_channels.find({"user_id": current_user["username"]}, {"_id": 0}).to_list(1000)
-    for channel in channels:
-        if isinstance(channel['created_at'], str):
-            channel['created_at'] = datetime.fromisoformat(channel['created_at'])
     # Sort by order
     channels.sort(key=lambda x: x.get('order', 0))
-    return channels
+    return FastJSONResponse(channels)
 
 @api_router.post("/contact-channels", response_model=ContactChannel)
 async def create_contact_channel(channel: ContactChannelCreate, current_user: dict = Depends(get_current_user)):
     channel_dict = channel.model_dump()
     channel_dict['user_id'] = current_user["username"]
     channel_dict['id'] = str(uuid.uuid4())
-    channel_dict['created_at'] = datetime.now(timezone.utc).isoformat()
+    channel_dict['created_at'] = datetime.now(timezone.utc)
     await db.contact_channels.insert_one(channel_dict)
-    channel_dict['created_at'] = datetime.fromisoformat(channel_dict['created_at'])
     return ContactChannel(**channel_dict)
 
 @api_router.put("/contact-channels/{channel_id}", response_model=ContactChannel)
@@ -563,8 +980,6 @@ async def update_contact_channel(channel_id: str, channel: ContactChannelCreate,
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Contact channel not found")
     updated = await db.contact_channels.find_one({"id": channel_id}, {"_id": 0})
-    if isinstance(updated['created_at'], str):
-        updated['created_at'] = datetime.fromisoformat(updated['created_at'])
     return ContactChannel(**updated)
 
 @api_router.delete("/contact-channels/{channel_id}")
@@ -575,275 +990,810 @@ async def delete_contact_channel(channel_id: str, current_user: dict = Depends(g
     return {"message": "Contact channel deleted successfully"}
 
 # Session storage for each channel (simulates separate browsers)
-channel_sessions = {}
-channel_cookies = {}
+# Cookies are served from memory and written behind to db.channel_sessions
+PROXY_COOKIE_FLUSH_INTERVAL = float(os.environ.get('PROXY_COOKIE_FLUSH_INTERVAL', 5))  # seconds
 
-@api_router.get("/proxy/{channel_id}")
-async def proxy_channel(channel_id: str, request: Request):
+class ChannelCookieStore:
     """
-    Proxy with session isolation per channel
-    Each channel_id maintains its own cookies/session in database
-    Usage: /api/proxy/channel123?url=https://web.whatsapp.com
+    In-memory cookie jars per channel. update() only marks a channel dirty when its cookies
+    actually changed; dirty channels are flushed together with one bulk_write every
+    flush_interval seconds and on shutdown.
     """
-    url = request.query_params.get('url')
-    if not url:
-        raise HTTPException(status_code=400, detail="url parameter required")
-    
-    try:
-        # Load or create persistent cookies for this channel
-        if channel_id not in channel_cookies:
-            # Try to load from database
-            stored_session = await db.channel_sessions.find_one({"channel_id": channel_id}, {"_id": 0})
-            if stored_session and 'cookies' in stored_session:
-                channel_cookies[channel_id] = stored_session['cookies']
-            else:
-                channel_cookies[channel_id] = {}
-        
-        # Get or create httpx client for this channel
-        if channel_id not in channel_sessions:
-            cookies_dict = channel_cookies.get(channel_id, {})
-            client_cookies = httpx.Cookies()
-            for name, value in cookies_dict.items():
-                client_cookies.set(name, value)
-            
-            channel_sessions[channel_id] = httpx.AsyncClient(
-                follow_redirects=True,
-                timeout=30.0,
-                cookies=client_cookies
-            )
-        
-        client = channel_sessions[channel_id]
-        
-        # Forward request with realistic headers (Latest Chrome)
-        headers = {
-            'User-Agent': f'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'tr-TR,tr;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Cache-Control': 'max-age=0',
-        }
-        
-        # Forward any cookies from original request
-        if 'cookie' in request.headers:
-            headers['Cookie'] = request.headers['cookie']
-        
-        response = await client.get(url, headers=headers)
-        
-        # Save updated cookies to database
-        updated_cookies = {}
-        for cookie in client.cookies.jar:
-            updated_cookies[cookie.name] = cookie.value
-        
-        if updated_cookies:
-            channel_cookies[channel_id] = updated_cookies
-            # Save to database (async, don't wait)
-            await db.channel_sessions.update_one(
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._cookies = {}
+        self._dirty = set()
+        self._flusher = None
+        self.flushes = 0
+        self.writes = 0
+
+    async def get(self, channel_id: str) -> dict:
+        cookies = self._cookies.get(channel_id)
+        if cookies is None:
+            stored_session = await db.channel_sessions.find_one({"channel_id": channel_id}, {"_id": 0, "cookies": 1})
+            cookies = self._cookies.setdefault(channel_id, (stored_session or {}).get('cookies') or {})
+        return cookies
+
+    def update(self, channel_id: str, cookies: dict):
+        if cookies and cookies != self._cookies.get(channel_id):
+            self._cookies[channel_id] = cookies
+            self._dirty.add(channel_id)
+
+    async def flush(self):
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        now = datetime.now(timezone.utc)
+        requests = [
+            UpdateOne(
                 {"channel_id": channel_id},
-                {"$set": {"channel_id": channel_id, "cookies": updated_cookies, "updated_at": datetime.now(timezone.utc).isoformat()}},
-                upsert=True
+                {"$set": {"channel_id": channel_id, "cookies": self._cookies[channel_id], "updated_at": now}},
+                upsert=True,
             )
-        
-        # Inject storage isolation script for HTML content
-        content = response.content
-        content_type = response.headers.get('content-type', '')
-        
-        if 'text/html' in content_type:
-            storage_script = f'''
-<script>
-(function() {{
-    const CHANNEL_ID = '{channel_id}';
+            for channel_id in dirty
+        ]
+        try:
+            await db.channel_sessions.bulk_write(requests, ordered=False)
+        except Exception as e:
+            # Retry on the next flush; newer changes are already in memory
+            self._dirty |= dirty
+            logger.error(f"Channel cookie flush failed for {len(dirty)} channels: {e}")
+            return
+        self.flushes += 1
+        self.writes += len(requests)
+
+    async def _flush_forever(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        if self._flusher is None:
+            self._flusher = spawn_background(self._flush_forever())
+
+    async def close(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {"cached_channels": len(self._cookies), "dirty_channels": len(self._dirty), "flushes": self.flushes, "writes": self.writes}
+
+channel_cookies = ChannelCookieStore(PROXY_COOKIE_FLUSH_INTERVAL)
+
+# Proxy clients: one httpx.AsyncClient per channel, bounded in number and closed when idle
+PROXY_MAX_CLIENTS = int(os.environ.get('PROXY_MAX_CLIENTS', 32))
+PROXY_CLIENT_IDLE_TTL = float(os.environ.get('PROXY_CLIENT_IDLE_TTL', 300))  # seconds
+PROXY_MAX_CONNECTIONS = int(os.environ.get('PROXY_MAX_CONNECTIONS', 20))
+PROXY_MAX_KEEPALIVE = int(os.environ.get('PROXY_MAX_KEEPALIVE', 10))
+PROXY_KEEPALIVE_EXPIRY = float(os.environ.get('PROXY_KEEPALIVE_EXPIRY', 30))  # seconds
+PROXY_HTTP2 = os.environ.get('PROXY_HTTP2', '').lower() in ('1', 'true', 'yes')
+
+class _ProxyClient:
+    __slots__ = ('client', 'last_used', 'active', 'retired')
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.last_used = time.monotonic()
+        self.active = 0
+        self.retired = False
+
+class ProxyClientManager:
+    """
+    LRU of per-channel httpx clients. A client is evicted when the LRU is full or it has been
+    idle longer than idle_ttl; one still serving a request is closed when its last lease is released.
+    Cookies survive eviction through channel_cookies, which seeds the replacement client.
+    """
+
+    def __init__(self, max_clients: int, idle_ttl: float, limits: httpx.Limits, http2: bool = False):
+        self.max_clients = max(1, max_clients)
+        self.idle_ttl = idle_ttl
+        self.limits = limits
+        self.http2 = http2
+        self._clients = OrderedDict()
+        self._retired = {}  # id(client) -> entry, evicted while a request was still using it
+        self._sweeper = None
+        self.created = 0
+        self.evicted = 0
+
+    def _new_client(self, cookies: dict) -> httpx.AsyncClient:
+        client_cookies = httpx.Cookies()
+        for name, value in cookies.items():
+            client_cookies.set(name, value)
+        self.created += 1
+        return httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=30.0,
+            cookies=client_cookies,
+            limits=self.limits,
+            http2=self.http2,
+        )
+
+    def acquire(self, channel_id: str, cookies: dict) -> httpx.AsyncClient:
+        entry = self._clients.get(channel_id)
+        if entry is None:
+            entry = self._clients[channel_id] = _ProxyClient(self._new_client(cookies))
+        self._clients.move_to_end(channel_id)
+        entry.active += 1
+        entry.last_used = time.monotonic()
+        self._evict(overflow_only=True)
+        return entry.client
+
+    def release(self, channel_id: str, client: httpx.AsyncClient):
+        entry = self._clients.get(channel_id)
+        if entry is None or entry.client is not client:
+            # Evicted while in use; close once nobody holds it
+            entry = self._retired.get(id(client))
+            if entry is None:
+                return
+        entry.active -= 1
+        entry.last_used = time.monotonic()
+        if entry.retired and entry.active == 0:
+            self._retired.pop(id(client), None)
+            spawn_background(client.aclose())
+
+    def _evict(self, overflow_only: bool = False):
+        now = time.monotonic()
+        for channel_id, entry in list(self._clients.items()):
+            overflow = len(self._clients) > self.max_clients
+            idle = entry.active == 0 and now - entry.last_used > self.idle_ttl
+            if not overflow and (overflow_only or not idle):
+                # Entries are in LRU order, so nothing after this one is older
+                break
+            self._retire(channel_id, entry)
+
+    def _retire(self, channel_id: str, entry: _ProxyClient):
+        del self._clients[channel_id]
+        self.evicted += 1
+        if entry.active:
+            entry.retired = True
+            self._retired[id(entry.client)] = entry
+        else:
+            spawn_background(entry.client.aclose())
+
+    async def _sweep_forever(self):
+        while True:
+            await asyncio.sleep(min(self.idle_ttl, 60))
+            self._evict()
+
+    def start(self):
+        if self.http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("PROXY_HTTP2 is set but the h2 package is not installed; using HTTP/1.1")
+                self.http2 = False
+        if self._sweeper is None:
+            self._sweeper = spawn_background(self._sweep_forever())
+
+    async def close(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        entries = list(self._clients.values()) + list(self._retired.values())
+        self._clients.clear()
+        self._retired.clear()
+        await asyncio.gather(*(entry.client.aclose() for entry in entries), return_exceptions=True)
+
+    def stats(self) -> dict:
+        pooled = idle = 0
+        for entry in list(self._clients.values()) + list(self._retired.values()):
+            # httpcore internals; absent on other transports
+            pool = getattr(getattr(entry.client, '_transport', None), '_pool', None)
+            for connection in getattr(pool, 'connections', []):
+                pooled += 1
+                idle += connection.is_idle()
+        return {
+            "open_clients": len(self._clients),
+            "retired_clients": len(self._retired),
+            "active_requests": sum(entry.active for entry in self._clients.values()),
+            "created": self.created,
+            "evicted": self.evicted,
+            "pooled_connections": pooled,
+            "idle_connections": idle,
+            "http2": self.http2,
+        }
+
+proxy_clients = ProxyClientManager(
+    PROXY_MAX_CLIENTS,
+    PROXY_CLIENT_IDLE_TTL,
+    httpx.Limits(
+        max_connections=PROXY_MAX_CONNECTIONS,
+        max_keepalive_connections=PROXY_MAX_KEEPALIVE,
+        keepalive_expiry=PROXY_KEEPALIVE_EXPIRY,
+    ),
+    http2=PROXY_HTTP2,
+)
+
+@api_router.get("/admin/proxy-stats")
+async def get_proxy_stats(current_user: dict = Depends(get_admin_user)):
+    return {"clients": proxy_clients.stats(), "cookies": channel_cookies.stats(), "assets": proxy_assets.stats()}
+
+# Streaming relay: bodies are passed through chunk by chunk instead of being buffered
+PROXY_INJECT_SCAN_BYTES = int(os.environ.get('PROXY_INJECT_SCAN_BYTES', 64 * 1024))
+HEAD_TAG_RE = re.compile(rb'<head(?:\s[^>]*)?>', re.IGNORECASE)
+HTML_TAG_RE = re.compile(rb'<html(?:\s[^>]*)?>', re.IGNORECASE)
+# Only advertise encodings httpx can decode, HTML bodies are decoded to inject the script
+try:
+    import brotli  # noqa: F401
+    PROXY_ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    PROXY_ACCEPT_ENCODING = 'gzip, deflate'
+# Request headers passed through from the browser: body description, ranges, XHR content negotiation
+PROXY_FORWARD_HEADERS = ('accept', 'content-type', 'content-length', 'range', 'if-range', 'origin', 'x-requested-with')
+PROXY_METHODS = ["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"]
+# Hop-by-hop and length headers are set again by the ASGI server
+PROXY_HOP_HEADERS = {'connection', 'keep-alive', 'transfer-encoding', 'te', 'trailer', 'upgrade', 'proxy-connection'}
+
+def _splice_script(prefix: bytes, script: bytes) -> bytes:
+    match = HEAD_TAG_RE.search(prefix) or HTML_TAG_RE.search(prefix)
+    if match:
+        return prefix[:match.end()] + script + prefix[match.end():]
+    # Fragments (XHR partials, bare snippets) are passed through untouched
+    return prefix
+
+async def inject_into_html(chunks, script: bytes):
+    """Insert script after <head> (else <html>) found in the first scan window; pages with neither are left as-is."""
+    pending = []
+    size = 0
+    async for chunk in chunks:
+        if pending is None:
+            yield chunk
+            continue
+        pending.append(chunk)
+        size += len(chunk)
+        prefix = b''.join(pending)
+        if size >= PROXY_INJECT_SCAN_BYTES or HEAD_TAG_RE.search(prefix):
+            pending = None
+            yield _splice_script(prefix, script)
+    if pending is not None:
+        yield _splice_script(b''.join(pending), script)
+
+def upstream_closer(response: httpx.Response, channel_id: str, client: httpx.AsyncClient):
+    """Release the channel client and close the upstream response; safe to call more than once."""
+    closed = False
+
+    async def close():
+        nonlocal closed
+        if closed:
+            return
+        closed = True
+        proxy_clients.release(channel_id, client)
+        # Runs after a client disconnect too, when the surrounding scope is already cancelled
+        with anyio.CancelScope(shield=True):
+            await response.aclose()
+    return close
+
+async def relay_upstream(body, close):
+    # Cleanup normally runs as the response's background task, which Starlette also runs when the
+    # browser disconnects before the body starts; it skips it when streaming raises, so close here
+    try:
+        async for chunk in body:
+            yield chunk
+    except Exception:
+        await close()
+        raise
+
+# Storage-isolation runtime, injected into every proxied HTML page.
+# Prepared once at import: either inlined from a bytes template with a channel-id slot, or
+# (PROXY_RUNTIME_EXTERNAL) served as the cacheable /api/proxy-runtime.js and referenced per page.
+PROXY_RUNTIME_EXTERNAL = os.environ.get('PROXY_RUNTIME_EXTERNAL', '').lower() in ('1', 'true', 'yes')
+PROXY_RUNTIME_SOURCE = r"""(function() {
+    const CHANNEL_ID = %CHANNEL_ID%;
     const PREFIX = 'channel_' + CHANNEL_ID + '_';
     
     // Override localStorage
     const originalLocalStorage = window.localStorage;
-    const channelStorage = {{
-        getItem: function(key) {{
+    const channelStorage = {
+        getItem: function(key) {
             return originalLocalStorage.getItem(PREFIX + key);
-        }},
-        setItem: function(key, value) {{
+        },
+        setItem: function(key, value) {
             return originalLocalStorage.setItem(PREFIX + key, value);
-        }},
-        removeItem: function(key) {{
+        },
+        removeItem: function(key) {
             return originalLocalStorage.removeItem(PREFIX + key);
-        }},
-        clear: function() {{
-            Object.keys(originalLocalStorage).forEach(key => {{
-                if (key.startsWith(PREFIX)) {{
+        },
+        clear: function() {
+            Object.keys(originalLocalStorage).forEach(key => {
+                if (key.startsWith(PREFIX)) {
                     originalLocalStorage.removeItem(key);
-                }}
-            }});
-        }},
-        get length() {{
+                }
+            });
+        },
+        get length() {
             return Object.keys(originalLocalStorage).filter(k => k.startsWith(PREFIX)).length;
-        }},
-        key: function(index) {{
+        },
+        key: function(index) {
             const keys = Object.keys(originalLocalStorage).filter(k => k.startsWith(PREFIX));
             return keys[index] ? keys[index].substring(PREFIX.length) : null;
-        }}
-    }};
+        }
+    };
     
-    Object.defineProperty(window, 'localStorage', {{
-        get: function() {{ return channelStorage; }},
+    Object.defineProperty(window, 'localStorage', {
+        get: function() { return channelStorage; },
         configurable: false
-    }});
+    });
     
     // Override sessionStorage
     const originalSessionStorage = window.sessionStorage;
-    const channelSessionStorage = {{
-        getItem: function(key) {{
+    const channelSessionStorage = {
+        getItem: function(key) {
             return originalSessionStorage.getItem(PREFIX + key);
-        }},
-        setItem: function(key, value) {{
+        },
+        setItem: function(key, value) {
             return originalSessionStorage.setItem(PREFIX + key, value);
-        }},
-        removeItem: function(key) {{
+        },
+        removeItem: function(key) {
             return originalSessionStorage.removeItem(PREFIX + key);
-        }},
-        clear: function() {{
-            Object.keys(originalSessionStorage).forEach(key => {{
-                if (key.startsWith(PREFIX)) {{
+        },
+        clear: function() {
+            Object.keys(originalSessionStorage).forEach(key => {
+                if (key.startsWith(PREFIX)) {
                     originalSessionStorage.removeItem(key);
-                }}
-            }});
-        }},
-        get length() {{
+                }
+            });
+        },
+        get length() {
             return Object.keys(originalSessionStorage).filter(k => k.startsWith(PREFIX)).length;
-        }},
-        key: function(index) {{
+        },
+        key: function(index) {
             const keys = Object.keys(originalSessionStorage).filter(k => k.startsWith(PREFIX));
             return keys[index] ? keys[index].substring(PREFIX.length) : null;
-        }}
-    }};
+        }
+    };
     
-    Object.defineProperty(window, 'sessionStorage', {{
-        get: function() {{ return channelSessionStorage; }},
+    Object.defineProperty(window, 'sessionStorage', {
+        get: function() { return channelSessionStorage; },
         configurable: false
-    }});
+    });
     
     // Override IndexedDB
     const originalIndexedDB = window.indexedDB;
-    const wrappedIndexedDB = {{
-        open: function(name, version) {{
+    const wrappedIndexedDB = {
+        open: function(name, version) {
             return originalIndexedDB.open(PREFIX + name, version);
-        }},
-        deleteDatabase: function(name) {{
+        },
+        deleteDatabase: function(name) {
             return originalIndexedDB.deleteDatabase(PREFIX + name);
-        }},
-        databases: originalIndexedDB.databases ? function() {{
+        },
+        databases: originalIndexedDB.databases ? function() {
             return originalIndexedDB.databases().then(dbs => 
                 dbs.filter(db => db.name.startsWith(PREFIX))
-                   .map(db => ({{ name: db.name.substring(PREFIX.length), version: db.version }}))
+                   .map(db => ({ name: db.name.substring(PREFIX.length), version: db.version }))
             );
-        }} : undefined,
+        } : undefined,
         cmp: originalIndexedDB.cmp
-    }};
+    };
     
-    Object.defineProperty(window, 'indexedDB', {{
-        get: function() {{ return wrappedIndexedDB; }},
+    Object.defineProperty(window, 'indexedDB', {
+        get: function() { return wrappedIndexedDB; },
         configurable: false
-    }});
+    });
     
     // Override BroadcastChannel
     const OriginalBroadcastChannel = window.BroadcastChannel;
-    window.BroadcastChannel = function(name) {{
+    window.BroadcastChannel = function(name) {
         return new OriginalBroadcastChannel(PREFIX + name);
-    }};
+    };
     window.BroadcastChannel.prototype = OriginalBroadcastChannel.prototype;
     
     // Override SharedWorker
-    if (window.SharedWorker) {{
+    if (window.SharedWorker) {
         const OriginalSharedWorker = window.SharedWorker;
-        window.SharedWorker = function(scriptURL, options) {{
-            if (typeof options === 'string') {{
+        window.SharedWorker = function(scriptURL, options) {
+            if (typeof options === 'string') {
                 return new OriginalSharedWorker(scriptURL, PREFIX + options);
-            }} else if (options && options.name) {{
+            } else if (options && options.name) {
                 options.name = PREFIX + options.name;
                 return new OriginalSharedWorker(scriptURL, options);
-            }}
-            return new OriginalSharedWorker(scriptURL, {{ name: PREFIX + 'default' }});
-        }};
+            }
+            return new OriginalSharedWorker(scriptURL, { name: PREFIX + 'default' });
+        };
         window.SharedWorker.prototype = OriginalSharedWorker.prototype;
-    }}
+    }
     
     // Block ServiceWorker registration (causes conflicts)
-    if ('serviceWorker' in navigator) {{
-        Object.defineProperty(navigator, 'serviceWorker', {{
-            get: function() {{
-                return {{
-                    register: function() {{ return Promise.reject(new Error('Service Worker blocked for isolation')); }},
+    if ('serviceWorker' in navigator) {
+        Object.defineProperty(navigator, 'serviceWorker', {
+            get: function() {
+                return {
+                    register: function() { return Promise.reject(new Error('Service Worker blocked for isolation')); },
                     ready: Promise.reject(new Error('Service Worker blocked')),
                     controller: null,
-                    getRegistration: function() {{ return Promise.resolve(undefined); }},
-                    getRegistrations: function() {{ return Promise.resolve([]); }}
-                }};
-            }}
-        }});
-    }}
+                    getRegistration: function() { return Promise.resolve(undefined); },
+                    getRegistrations: function() { return Promise.resolve([]); }
+                };
+            }
+        });
+    }
     
     console.log('✅ Full storage isolation for channel:', CHANNEL_ID);
-}})();
-</script>
-'''
+})();
+"""
+
+_runtime_prefix, _runtime_suffix = ('\n<script>\n' + PROXY_RUNTIME_SOURCE + '</script>\n').encode('utf-8').split(b'%CHANNEL_ID%')
+PROXY_RUNTIME_JS = PROXY_RUNTIME_SOURCE.replace('%CHANNEL_ID%', 'document.currentScript.dataset.channel').encode('utf-8')
+PROXY_RUNTIME_VERSION = hashlib.sha256(PROXY_RUNTIME_JS).hexdigest()[:16]
+
+def isolation_script(channel_id: str) -> bytes:
+    if PROXY_RUNTIME_EXTERNAL:
+        return (f'\n<script src="/api/proxy-runtime.js?v={PROXY_RUNTIME_VERSION}" '
+                f'data-channel="{html.escape(channel_id)}"></script>\n').encode('utf-8')
+    # JSON string literal; "</" is escaped so the id can't close the script element
+    return _runtime_prefix + json.dumps(channel_id).replace('</', '<\\/').encode('utf-8') + _runtime_suffix
+
+@api_router.get("/proxy-runtime.js")
+async def get_proxy_runtime(request: Request):
+    headers = {"Cache-Control": "public, max-age=31536000, immutable", "ETag": f'"{PROXY_RUNTIME_VERSION}"'}
+    if request.headers.get('if-none-match') == headers['ETag']:
+        return Response(status_code=304, headers=headers)
+    return Response(content=PROXY_RUNTIME_JS, media_type="application/javascript", headers=headers)
+
+# Proxy asset cache: static, cookie-independent responses shared by every channel,
+# stored still encoded under PROXY_ASSET_CACHE_DIR and evicted LRU by total size
+PROXY_ASSET_CACHE_DIR = Path(os.environ.get('PROXY_ASSET_CACHE_DIR', ROOT_DIR / 'proxy_cache'))
+PROXY_ASSET_CACHE_MAX_BYTES = int(os.environ.get('PROXY_ASSET_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+PROXY_ASSET_MAX_ENTRY_BYTES = int(os.environ.get('PROXY_ASSET_MAX_ENTRY_BYTES', 16 * 1024 * 1024))
+PROXY_ASSET_DEFAULT_TTL = int(os.environ.get('PROXY_ASSET_DEFAULT_TTL', 24 * 3600))  # seconds, fingerprinted URLs
+PROXY_ASSET_TYPES = ('text/css', 'javascript', 'font/', 'application/font', 'application/x-font', 'image/', 'application/wasm')
+PROXY_ASSET_HEADERS = ('content-type', 'content-encoding', 'etag', 'last-modified')
+FINGERPRINT_RE = re.compile(r'[./_-][0-9a-f]{8,}[./_-]', re.IGNORECASE)
+PROXY_CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Credentials': 'true',
+    'Access-Control-Allow-Methods': '*',
+    'Access-Control-Allow-Headers': '*',
+}
+
+def parse_cache_control(value: str) -> dict:
+    directives = {}
+    for part in value.split(','):
+        name, _, arg = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = arg.strip('"')
+    return directives
+
+def asset_ttl(url: str, headers) -> Optional[int]:
+    """Seconds a response may be shared across channels, None when it must not be cached."""
+    content_type = headers.get('content-type', '').lower()
+    if not any(t in content_type for t in PROXY_ASSET_TYPES) or 'set-cookie' in headers:
+        return None
+    vary = headers.get('vary', '').lower()
+    if '*' in vary or 'cookie' in vary:
+        return None
+    cache_control = parse_cache_control(headers.get('cache-control', ''))
+    if {'no-store', 'no-cache', 'private'} & cache_control.keys():
+        return None
+    for directive in ('s-maxage', 'max-age'):
+        if directive in cache_control:
+            try:
+                ttl = int(cache_control[directive])
+            except ValueError:
+                return None
+            return ttl if ttl > 0 else None
+    if 'expires' in headers:
+        try:
+            ttl = int(parsedate_to_datetime(headers['expires']).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+        return ttl if ttl > 0 else None
+    if 'immutable' in cache_control or FINGERPRINT_RE.search(urlsplit(url).path):
+        return PROXY_ASSET_DEFAULT_TTL
+    return None
+
+class ProxyAssetCache:
+    """
+    Disk LRU for proxied static assets, keyed by URL. Bodies are buffered while they stream
+    to the browser and written (in a worker thread) only once complete. Stale entries with validators
+    are revalidated upstream with If-None-Match / If-Modified-Since.
+    """
+
+    def __init__(self, root: Path, max_bytes: int, max_entry_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.size = 0
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.stores = 0
+        self._entries = OrderedDict()  # key -> meta
+        # Re-index entries left by a previous process, oldest first
+        for meta_path in sorted(self.root.glob('*/*.json'), key=lambda p: p.stat().st_mtime):
             try:
-                html_content = content.decode('utf-8')
-                # Inject script right after <head> tag
-                if '<head>' in html_content:
-                    html_content = html_content.replace('<head>', '<head>' + storage_script, 1)
-                elif '<html>' in html_content:
-                    html_content = html_content.replace('<html>', '<html>' + storage_script, 1)
+                meta = json.loads(meta_path.read_text())
+                self._entries[meta_path.stem] = meta
+                self.size += meta['size']
+            except (OSError, ValueError, KeyError):
+                continue
+
+    @staticmethod
+    def make_key(url: str) -> str:
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _paths(self, key: str):
+        directory = self.root / key[:2]
+        return directory / key, directory / f"{key}.json"
+
+    def lookup(self, url: str):
+        key = self.make_key(url)
+        meta = self._entries.get(key)
+        if meta is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        return key, meta
+
+    def validators(self, meta: dict) -> dict:
+        headers = {}
+        if meta['headers'].get('etag'):
+            headers['If-None-Match'] = meta['headers']['etag']
+        if meta['headers'].get('last-modified'):
+            headers['If-Modified-Since'] = meta['headers']['last-modified']
+        return headers
+
+    async def refresh(self, key: str, meta: dict, headers) -> bool:
+        # 304 from upstream: keep the body, take the new freshness and validators
+        merged = {**meta['headers'], **{k: headers[k] for k in PROXY_ASSET_HEADERS if k in headers}}
+        for name in ('cache-control', 'expires', 'vary'):
+            if name in headers:
+                merged[name] = headers[name]
+        ttl = asset_ttl(meta['url'], merged)
+        if ttl is None:
+            await self.drop(key)
+            return False
+        meta['headers'] = {k: merged[k] for k in PROXY_ASSET_HEADERS if k in merged}
+        meta['expires_at'] = time.time() + ttl
+        try:
+            await anyio.to_thread.run_sync(self._paths(key)[1].write_text, json.dumps(meta))
+        except OSError:
+            pass
+        self.revalidated += 1
+        return True
+
+    def respond(self, key: str, meta: dict, request: Request) -> Response:
+        self.hits += 1
+        max_age = max(0, int(meta['expires_at'] - time.time()))
+        headers = {k: v for k, v in meta['headers'].items() if k != 'content-type'}
+        headers.update(PROXY_CORS_HEADERS)
+        headers['Cache-Control'] = f"public, max-age={max_age}"
+        headers['X-Proxy-Cache'] = 'HIT'
+        etag = meta['headers'].get('etag')
+        if etag and request.headers.get('if-none-match') == etag:
+            return Response(status_code=304, headers=headers)
+        return FileResponse(self._paths(key)[0], headers=headers, media_type=meta['headers'].get('content-type'))
+
+    async def tee(self, url: str, headers, ttl: int, chunks):
+        """Yield chunks unchanged while buffering them (up to max_entry_bytes); store the entry once the body completes."""
+        buffered = []
+        size = 0
+        async for chunk in chunks:
+            if buffered is not None:
+                size += len(chunk)
+                if size > self.max_entry_bytes:
+                    buffered = None
                 else:
-                    html_content = storage_script + html_content
-                content = html_content.encode('utf-8')
-            except:
-                pass  # If decode fails, return original content
+                    buffered.append(chunk)
+            yield chunk
+        if buffered is None:
+            return
+        key = self.make_key(url)
+        meta = {
+            "url": url,
+            "size": size,
+            "headers": {k: headers[k] for k in PROXY_ASSET_HEADERS if k in headers},
+            "expires_at": time.time() + ttl,
+        }
+        # The browser may go away right after the last chunk; the body is complete, so store it anyway
+        with anyio.CancelScope(shield=True):
+            if await anyio.to_thread.run_sync(self._write_files, key, b''.join(buffered), meta):
+                await self._commit(key, meta)
+
+    def _write_files(self, key: str, body: bytes, meta: dict) -> bool:
+        # Blocking; runs in a worker thread
+        body_path, meta_path = self._paths(key)
+        tmp_path = body_path.with_name(f"{key}.{uuid.uuid4().hex}.tmp")
+        try:
+            body_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_bytes(body)
+            os.replace(tmp_path, body_path)
+            meta_path.write_text(json.dumps(meta))
+        except OSError as e:
+            logger.warning(f"Proxy asset cache write failed: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return False
+        return True
+
+    def _remove_files(self, keys):
+        for key in keys:
+            for path in self._paths(key):
+                path.unlink(missing_ok=True)
+
+    async def _commit(self, key: str, meta: dict):
+        # Index bookkeeping stays on the event loop; only the evicted files are removed in a thread
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= old['size']
+        self._entries[key] = meta
+        self.size += meta['size']
+        self.stores += 1
+        evicted = []
+        while self.size > self.max_bytes and self._entries:
+            old_key, old = self._entries.popitem(last=False)
+            self.size -= old['size']
+            evicted.append(old_key)
+        if evicted:
+            await anyio.to_thread.run_sync(self._remove_files, evicted)
+
+    async def drop(self, key: str):
+        meta = self._entries.pop(key, None)
+        if meta is None:
+            return
+        self.size -= meta['size']
+        await anyio.to_thread.run_sync(self._remove_files, [key])
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "size": self.size,
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "stores": self.stores,
+        }
+
+proxy_assets = ProxyAssetCache(PROXY_ASSET_CACHE_DIR, PROXY_ASSET_CACHE_MAX_BYTES, PROXY_ASSET_MAX_ENTRY_BYTES)
+
+@api_router.api_route("/proxy/{channel_id}", methods=PROXY_METHODS)
+async def proxy_channel(channel_id: str, request: Request):
+    """
+    Proxy with session isolation per channel
+    Each channel_id maintains its own cookies/session in database
+    Usage: /api/proxy/channel123?url=https://web.whatsapp.com
+    Any method is forwarded; request bodies are streamed upstream as they arrive
+    """
+    url = request.query_params.get('url')
+    if not url:
+        raise HTTPException(status_code=400, detail="url parameter required")
+    
+    # Shared static assets are served from disk without touching the channel session
+    cacheable = request.method == "GET" and 'range' not in request.headers
+    cached = proxy_assets.lookup(url) if cacheable else None
+    if cached and cached[1]['expires_at'] > time.time():
+        return proxy_assets.respond(*cached, request)
+    
+    try:
+        # Load persistent cookies for this channel
+        cookies = await channel_cookies.get(channel_id)
+        client = proxy_clients.acquire(channel_id, cookies)
+    except Exception as e:
+        logger.error(f"Proxy error for channel {channel_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Proxy error: {str(e)}")
+
+    response = None
+    try:
+        # Forward request with realistic headers (Latest Chrome)
+        headers = {
+            'User-Agent': f'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'tr-TR,tr;q=0.9,en-US;q=0.8,en;q=0.7',
+            'Accept-Encoding': PROXY_ACCEPT_ENCODING,
+            'DNT': '1',
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1',
+            'Sec-Fetch-Dest': 'document',
+            'Sec-Fetch-Mode': 'navigate',
+            'Sec-Fetch-Site': 'none',
+            'Cache-Control': 'max-age=0',
+        }
+        
+        # Forward any cookies from original request
+        if 'cookie' in request.headers:
+            headers['Cookie'] = request.headers['cookie']
+        
+        for name in PROXY_FORWARD_HEADERS:
+            if name in request.headers:
+                headers[name.title()] = request.headers[name]
+        
+        # Revalidate a stale cached asset instead of downloading it again
+        validators = proxy_assets.validators(cached[1]) if cached else {}
+        
+        # Bodies are relayed chunk by chunk (chunked upstream unless the browser sent a Content-Length)
+        has_body = 'content-length' in request.headers or 'transfer-encoding' in request.headers
+        upstream_request = client.build_request(
+            request.method, url, headers={**headers, **validators}, content=request.stream() if has_body else None
+        )
+        response = await client.send(upstream_request, stream=True)
+        
+        if cached and response.status_code == 304:
+            await response.aclose()
+            if await proxy_assets.refresh(*cached, response.headers):
+                proxy_clients.release(channel_id, client)
+                return proxy_assets.respond(*cached, request)
+            # No longer cacheable, so refresh dropped the entry; the browser sent no validators of
+            # its own and needs the full body, so fetch it again unconditionally
+            cached = None
+            response = await client.send(client.build_request(request.method, url, headers=headers), stream=True)
+        
+        # Remember updated cookies; changed jars are flushed to the database in batches
+        updated_cookies = {}
+        for cookie in client.cookies.jar:
+            updated_cookies[cookie.name] = cookie.value
+        channel_cookies.update(channel_id, updated_cookies)
+        
+        # Inject storage isolation script for HTML content
+        content_type = response.headers.get('content-type', '')
+        # Partial content and HEAD responses are relayed untouched
+        is_html = 'text/html' in content_type and request.method != "HEAD" and response.status_code != 206
+        asset_max_age = None
+        
+        if is_html:
+            # HTML is decoded (gunzip etc.) so the prebuilt script can be spliced in as bytes
+            body = inject_into_html(response.aiter_bytes(), isolation_script(channel_id))
+        else:
+            # Everything else is relayed still encoded, with its original Content-Encoding/Length
+            body = response.aiter_raw()
+            if cacheable and response.status_code == 200:
+                asset_max_age = asset_ttl(str(response.url), response.headers)
+            if asset_max_age:
+                body = proxy_assets.tee(url, response.headers, asset_max_age, body)
+            elif cached:
+                await proxy_assets.drop(cached[0])
         
         # Remove blocking headers
         clean_headers = {}
         blocked_headers = {
             'x-frame-options', 'content-security-policy', 
             'content-security-policy-report-only', 'x-content-security-policy',
-            'strict-transport-security', 'x-xss-protection'
+            'strict-transport-security', 'x-xss-protection',
+            # Caching headers are set below
+            'cache-control', 'pragma', 'expires',
         }
         
+        if is_html:
+            blocked_headers = blocked_headers | {'content-encoding', 'content-length'}
+        
         for k, v in response.headers.items():
-            if k.lower() not in blocked_headers:
+            if k.lower() not in blocked_headers and k.lower() not in PROXY_HOP_HEADERS:
                 clean_headers[k] = v
         
         # Add permissive CORS headers
-        clean_headers['Access-Control-Allow-Origin'] = '*'
-        clean_headers['Access-Control-Allow-Credentials'] = 'true'
-        clean_headers['Access-Control-Allow-Methods'] = '*'
-        clean_headers['Access-Control-Allow-Headers'] = '*'
+        clean_headers.update(PROXY_CORS_HEADERS)
         
-        # Disable cache for dynamic content
-        clean_headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-        clean_headers['Pragma'] = 'no-cache'
-        clean_headers['Expires'] = '0'
+        if asset_max_age:
+            # Shared static asset: the browser may keep it too
+            clean_headers['Cache-Control'] = f"public, max-age={asset_max_age}"
+            clean_headers['X-Proxy-Cache'] = 'MISS'
+        else:
+            # Disable cache for dynamic content
+            clean_headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+            clean_headers['Pragma'] = 'no-cache'
+            clean_headers['Expires'] = '0'
         
-        return Response(
-            content=content,
+        # The background task releases the client and closes the upstream response once the body is done
+        close = upstream_closer(response, channel_id, client)
+        return StreamingResponse(
+            relay_upstream(body, close),
             status_code=response.status_code,
             headers=clean_headers,
-            media_type=content_type
+            media_type=content_type,
+            background=BackgroundTask(close),
         )
         
     except Exception as e:
+        proxy_clients.release(channel_id, client)
+        if response is not None:
+            await response.aclose()
         logger.error(f"Proxy error for channel {channel_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Proxy error: {str(e)}")
 
 @api_router.get("/users", response_model=List[UserResponse])
 async def get_users(current_user: dict = Depends(get_admin_user)):
     users = await db.users.find({}, {"_id": 0, "password_hash": 0}).to_list(1000)
-    for user in users:
-        if isinstance(user['created_at'], str):
-            user['created_at'] = datetime.fromisoformat(user['created_at'])
-    return users
+    return FastJSONResponse(users)
 
 @api_router.post("/users", response_model=UserResponse)
 async def create_user_by_admin(user: UserCreateByAdmin, current_user: dict = Depends(get_admin_user)):
@@ -853,11 +1803,10 @@ async def create_user_by_admin(user: UserCreateByAdmin, current_user: dict = Dep
     
     user_obj = User(
         username=user.username,
-        password_hash=hash_password(user.password),
+        password_hash=await hash_password(user.password),
         role=user.role
     )
     doc = user_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.users.insert_one(doc)
     
     return UserResponse(
@@ -875,6 +1824,7 @@ async def delete_user(user_id: str, current_user: dict = Depends(get_admin_user)
         raise HTTPException(status_code=400, detail="Cannot delete your own account")
     
     result = await db.users.delete_one({"id": user_id})
+    user_cache.invalidate(user_id=user_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     return {"message": "User deleted successfully"}
@@ -885,10 +1835,12 @@ async def reset_user_password(user_id: str, password_data: dict, current_user: d
     if not new_password or len(new_password) < 4:
         raise HTTPException(status_code=400, detail="Password must be at least 4 characters")
     
+    password_hash = await hash_password(new_password)
     result = await db.users.update_one(
         {"id": user_id},
-        {"$set": {"password_hash": hash_password(new_password)}}
+        {"$set": {"password_hash": password_hash}}
     )
+    user_cache.invalidate(user_id=user_id)
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     return {"message": "Password reset successfully"}
@@ -903,50 +1855,252 @@ async def update_user_role(user_id: str, role_data: dict, current_user: dict = D
         {"id": user_id},
         {"$set": {"role": new_role}}
     )
+    user_cache.invalidate(user_id=user_id)
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     return {"message": "Role updated successfully"}
 
 
+# Image store: originals and thumbnails live on disk under their SHA-256, documents only keep a URL
+IMAGE_STORE_DIR = Path(os.environ.get('IMAGE_STORE_DIR', ROOT_DIR / 'images'))
+IMAGE_URL_PREFIX = '/api/images/'
+IMAGE_THUMBNAIL_SIZE = int(os.environ.get('IMAGE_THUMBNAIL_SIZE', 256))
+IMAGE_HASH_RE = re.compile(r'^[0-9a-f]{64}$')
+IMAGE_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+IMAGE_MEDIA_TYPES = {'jpg': 'image/jpeg', 'png': 'image/png', 'gif': 'image/gif', 'webp': 'image/webp'}
+
+class ImageStore:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._paths = {}
+
+    def _dir(self, image_hash: str) -> Path:
+        return self.root / image_hash[:2]
+
+    @staticmethod
+    def _write(path: Path, data: bytes):
+        # Unique temp name: concurrent saves of the same image must not share (and steal) one file
+        tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    def save(self, raw: bytes) -> str:
+        # Blocking (hashing, Pillow decode/resize, file IO); call from an executor
+        image_hash = hashlib.sha256(raw).hexdigest()
+        if self.find(image_hash, 'original'):
+            return image_hash
+
+        with PILImage.open(io.BytesIO(raw)) as img:
+            ext = IMAGE_FORMATS.get(img.format)
+            if ext is None:
+                raise ValueError(f"Unsupported image format: {img.format}")
+            thumb = img.convert('RGBA' if img.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        thumb.thumbnail((IMAGE_THUMBNAIL_SIZE, IMAGE_THUMBNAIL_SIZE))
+        thumb_buffer = io.BytesIO()
+        thumb.save(thumb_buffer, 'WEBP', quality=80)
+
+        directory = self._dir(image_hash)
+        directory.mkdir(parents=True, exist_ok=True)
+        # Original last: its presence marks the entry complete
+        self._write(directory / f"{image_hash}_thumb.webp", thumb_buffer.getvalue())
+        self._write(directory / f"{image_hash}.{ext}", raw)
+        return image_hash
+
+    def find(self, image_hash: str, variant: str = 'original') -> Optional[Path]:
+        path = self._paths.get((image_hash, variant))
+        if path is not None:
+            return path
+        directory = self._dir(image_hash)
+        if variant == 'thumb':
+            candidates = [directory / f"{image_hash}_thumb.webp"]
+        else:
+            candidates = [directory / f"{image_hash}.{ext}" for ext in IMAGE_MEDIA_TYPES]
+        for candidate in candidates:
+            if candidate.is_file():
+                self._paths[(image_hash, variant)] = candidate
+                return candidate
+        return None
+
+image_store = ImageStore(IMAGE_STORE_DIR)
+# Bad base64 (binascii.Error is a ValueError), undecodable bytes, and images past Pillow's pixel limit
+INVALID_IMAGE_ERRORS = (ValueError, OSError, PILImage.DecompressionBombError)
+
+def thumbnail_url(url: Optional[str]) -> Optional[str]:
+    if url and url.startswith(IMAGE_URL_PREFIX):
+        return url + "?size=thumb"
+    return None
+
+async def store_inline_image(value: Optional[str]) -> Optional[str]:
+    # data: URLs are moved into the image store; references and external URLs pass through
+    if not value or not value.startswith('data:'):
+        return value
+    header, sep, payload = value.partition(',')
+    if not sep or not header.endswith(';base64'):
+        raise ValueError("Malformed data: URL, expected data:<type>;base64,<payload>")
+    raw = base64.b64decode(payload)
+    loop = asyncio.get_running_loop()
+    image_hash = await loop.run_in_executor(None, image_store.save, raw)
+    return f"{IMAGE_URL_PREFIX}{image_hash}"
+
+async def store_image_or_400(value: Optional[str]) -> Optional[str]:
+    try:
+        return await store_inline_image(value)
+    except INVALID_IMAGE_ERRORS:
+        raise HTTPException(status_code=400, detail="Invalid image")
+
+@api_router.get("/images/{image_hash}")
+async def get_image(image_hash: str, request: Request, size: Literal["original", "thumb"] = "original"):
+    # Public on purpose: <img> tags can't send the bearer token, and hashes are unguessable
+    if not IMAGE_HASH_RE.match(image_hash):
+        raise HTTPException(status_code=404, detail="Image not found")
+    path = image_store.find(image_hash, size)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    etag = f'"{image_hash}-{size}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if_none_match = request.headers.get('if-none-match', '')
+    if if_none_match == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=IMAGE_MEDIA_TYPES[path.suffix[1:]], headers=headers)
+
+async def migrate_inline_images():
+    # One-off and idempotent: only documents still holding data: URLs match
+    products_moved = 0
+    async for product in db.products.find({"image": {"$regex": "^data:"}}, {"_id": 0, "id": 1, "image": 1}):
+        try:
+            url = await store_inline_image(product['image'])
+        except INVALID_IMAGE_ERRORS as e:
+            logger.warning(f"Skipping image of product {product['id']}: {e}")
+            continue
+        await db.products.update_one(
+            {"id": product['id']},
+            {"$set": {"image": url, "image_thumbnail": thumbnail_url(url)}}
+        )
+        products_moved += 1
+
+    quotes_moved = 0
+    async for quote in db.quotes.find({"items.product_image": {"$regex": "^data:"}}, {"_id": 0, "id": 1, "items": 1}):
+        for item in quote['items']:
+            try:
+                item['product_image'] = await store_inline_image(item.get('product_image'))
+            except INVALID_IMAGE_ERRORS as e:
+                logger.warning(f"Dropping unreadable image in quote {quote['id']}: {e}")
+                item['product_image'] = None
+        await db.quotes.update_one({"id": quote['id']}, {"$set": {"items": quote['items']}})
+        quotes_moved += 1
+
+    if products_moved or quotes_moved:
+        logger.info(f"Moved inline images to the image store: {products_moved} products, {quotes_moved} quotes")
+
 # Product endpoints
 @api_router.post("/products", response_model=Product)
 async def create_product(product: ProductCreate, current_user: dict = Depends(get_current_user)):
-    product_obj = Product(**product.model_dump())
+    product.image = await store_image_or_400(product.image)
+    product_obj = Product(**product.model_dump(), image_thumbnail=thumbnail_url(product.image))
     doc = product_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.products.insert_one(doc)
     return product_obj
 
 
+# Customer search: each customer carries normalized copies of the searchable fields under
+# "search", so case-insensitive prefix matches become anchored regexes on (user_id, search.<field>) indexes
+CUSTOMER_SEARCH_FIELDS = ('name', 'company', 'email', 'phone')
+CUSTOMER_SEARCH_MAX = 50
+
+def normalize_search_text(value: Optional[str]) -> str:
+    # Case- and accent-insensitive; Turkish dotted/dotless i both fold to "i"
+    decomposed = unicodedata.normalize('NFKD', value or '')
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return stripped.casefold().replace('ı', 'i').strip()
+
+def normalize_phone(value: Optional[str]) -> str:
+    return re.sub(r'\D', '', value or '')
+
+def customer_search_fields(customer: dict) -> dict:
+    return {
+        field: normalize_phone(customer.get(field)) if field == 'phone' else normalize_search_text(customer.get(field))
+        for field in CUSTOMER_SEARCH_FIELDS
+    }
+
+async def migrate_customer_search_fields(batch_size: int = 500):
+    # Online and resumable: backfills customers written before the search fields existed
+    projection = {field: 1 for field in CUSTOMER_SEARCH_FIELDS}
+    migrated = 0
+    while True:
+        batch = await db.customers.find({"search": {"$exists": False}}, projection).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        await db.customers.bulk_write(
+            [UpdateOne({"_id": doc['_id']}, {"$set": {"search": customer_search_fields(doc)}}) for doc in batch],
+            ordered=False,
+        )
+        migrated += len(batch)
+        await asyncio.sleep(0)
+    if migrated:
+        logger.info(f"Added search fields to {migrated} customers")
+
 # Customer endpoints
 @api_router.get("/customers", response_model=List[Customer])
 async def get_customers(current_user: dict = Depends(get_current_user)):
-    customers = await db.customers.find({"user_id": current_user['id']}, {"_id": 0}).to_list(1000)
-    for customer in customers:
-        if isinstance(customer['created_at'], str):
-            customer['created_at'] = datetime.fromisoformat(customer['created_at'])
-    return customers
+    customers = await db.customers.find({"user_id": current_user['id']}, {"_id": 0, "search": 0}).to_list(1000)
+    return FastJSONResponse(customers)
+
+@api_router.get("/customers/search", response_model=List[Customer])
+async def search_customers(
+    q: str,
+    limit: int = Query(10, ge=1, le=CUSTOMER_SEARCH_MAX),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Typeahead: case-insensitive prefix match on name, company, email and phone.
+    Ranked by matching field (name first), then by the matched value, so exact matches lead.
+    """
+    terms = {field: normalize_phone(q) if field == 'phone' else normalize_search_text(q) for field in CUSTOMER_SEARCH_FIELDS}
+    # One index-bounded query per field, run concurrently
+    fields = [field for field in CUSTOMER_SEARCH_FIELDS if terms[field]]
+    results = await asyncio.gather(*(
+        db.customers.find(
+            {"user_id": current_user['id'], f"search.{field}": {"$regex": "^" + re.escape(terms[field])}},
+            {"_id": 0},
+        ).sort(f"search.{field}", 1).limit(limit).to_list(limit)
+        for field in fields
+    ))
+
+    ranked = {}
+    for rank, (field, customers) in enumerate(zip(fields, results)):
+        for customer in customers:
+            # Same order as the per-field index scan, so the limited queries return the top matches
+            key = (rank, customer['search'][field])
+            if customer['id'] not in ranked or key < ranked[customer['id']][0]:
+                ranked[customer['id']] = (key, customer)
+    matches = [customer for _, customer in sorted(ranked.values(), key=lambda entry: entry[0])[:limit]]
+    for customer in matches:
+        del customer['search']
+    return FastJSONResponse(matches)
 
 @api_router.post("/customers", response_model=Customer)
 async def create_customer(customer: CustomerCreate, current_user: dict = Depends(get_current_user)):
     customer_obj = Customer(**customer.model_dump(), user_id=current_user['id'])
     doc = customer_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
+    doc['search'] = customer_search_fields(doc)
     await db.customers.insert_one(doc)
     return customer_obj
 
 @api_router.put("/customers/{customer_id}", response_model=Customer)
 async def update_customer(customer_id: str, customer: CustomerCreate, current_user: dict = Depends(get_current_user)):
-    result = await db.customers.update_one(
+    updated = await db.customers.find_one_and_update(
         {"id": customer_id, "user_id": current_user['id']},
-        {"$set": customer.model_dump()}
+        {"$set": {**customer.model_dump(), "search": customer_search_fields(customer.model_dump())}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER,
     )
-    if result.matched_count == 0:
+    if not updated:
         raise HTTPException(status_code=404, detail="Customer not found")
-    
-    updated = await db.customers.find_one({"id": customer_id}, {"_id": 0})
-    if isinstance(updated['created_at'], str):
-        updated['created_at'] = datetime.fromisoformat(updated['created_at'])
     return Customer(**updated)
 
 @api_router.delete("/customers/{customer_id}")
@@ -956,35 +2110,100 @@ async def delete_customer(customer_id: str, current_user: dict = Depends(get_cur
         raise HTTPException(status_code=404, detail="Customer not found")
     return {"message": "Customer deleted successfully"}
 
-@api_router.get("/products", response_model=List[Product])
-async def get_products(current_user: dict = Depends(get_current_user)):
-    products = await db.products.find({}, {"_id": 0}).to_list(1000)
-    for product in products:
-        if isinstance(product['created_at'], str):
-            product['created_at'] = datetime.fromisoformat(product['created_at'])
-    return products
+# Keyset pagination helpers: cursors are opaque, URL-safe encodings of the last row's sort key
+CURSOR_JSON_OPTIONS = json_util.JSONOptions(tz_aware=True, tzinfo=timezone.utc)
+
+def encode_cursor(*values) -> str:
+    # Extended JSON keeps datetimes as datetimes through the round trip
+    raw = json_util.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str, types: tuple) -> list:
+    """Decode a cursor holding one value per entry of types (a type or tuple of types each)."""
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)), json_options=CURSOR_JSON_OPTIONS)
+    except (ValueError, TypeError, IndexError, KeyError):
+        # Malformed extended JSON ({"$date": "bad"} etc.) surfaces as any of these
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # The values go straight into the query, so documents/operators must not get through
+    if not isinstance(values, list) or len(values) != len(types) or not all(
+        isinstance(value, expected) and not isinstance(value, bool) for value, expected in zip(values, types)
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+PRODUCT_PAGE_MAX = 1000
+
+def product_projection(fields: Optional[str]) -> dict:
+    # Default drops the full-size image; "*" returns whole documents
+    if fields is None:
+        return {"_id": 0, "image": 0}
+    if fields.strip() == "*":
+        return {"_id": 0}
+    requested = {f.strip() for f in fields.split(',') if f.strip()}
+    unknown = requested - set(ProductListItem.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown product fields: {', '.join(sorted(unknown))}")
+    # id and created_at are the sort key, always needed for the next cursor
+    projection = {"_id": 0, "id": 1, "created_at": 1}
+    for field in requested:
+        projection[field] = 1
+    return projection
+
+@api_router.get("/products", response_model=List[ProductListItem], response_model_exclude_unset=True)
+async def get_products(
+    category: Optional[str] = None,
+    group: Optional[str] = None,
+    fields: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(PRODUCT_PAGE_MAX, ge=1, le=PRODUCT_PAGE_MAX),
+    current_user: dict = Depends(get_current_user),
+):
+    query = {}
+    if category:
+        query['category'] = category
+    if group:
+        query['group'] = group
+    total = await db.products.count_documents(query)
+
+    if after:
+        created_at, last_id = decode_cursor(after, (datetime, str))
+        query['$or'] = [
+            {"created_at": {"$gt": created_at}},
+            {"created_at": created_at, "id": {"$gt": last_id}},
+        ]
+
+    products = await db.products.find(query, product_projection(fields)) \
+        .sort([("created_at", 1), ("id", 1)]).limit(limit).to_list(limit)
+
+    headers = {'X-Total-Count': str(total)}
+    if len(products) == limit:
+        last = products[-1]
+        headers['X-Next-Cursor'] = encode_cursor(last['created_at'], last['id'])
+
+    return FastJSONResponse(products, headers=headers)
 
 @api_router.get("/products/{product_id}", response_model=Product)
 async def get_product(product_id: str, current_user: dict = Depends(get_current_user)):
     product = await db.products.find_one({"id": product_id}, {"_id": 0})
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    if isinstance(product['created_at'], str):
-        product['created_at'] = datetime.fromisoformat(product['created_at'])
     return product
 
 @api_router.put("/products/{product_id}", response_model=Product)
 async def update_product(product_id: str, product: ProductCreate, current_user: dict = Depends(get_current_user)):
-    existing_product = await db.products.find_one({"id": product_id}, {"_id": 0})
-    if not existing_product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    
+    product.image = await store_image_or_400(product.image)
     update_data = product.model_dump()
-    await db.products.update_one({"id": product_id}, {"$set": update_data})
-    
-    updated_product = await db.products.find_one({"id": product_id}, {"_id": 0})
-    if isinstance(updated_product['created_at'], str):
-        updated_product['created_at'] = datetime.fromisoformat(updated_product['created_at'])
+    update_data['image_thumbnail'] = thumbnail_url(product.image)
+    updated_product = await db.products.find_one_and_update(
+        {"id": product_id},
+        {"$set": update_data},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not updated_product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    await pdf_cache.invalidate(f"product:{product_id}")
     return updated_product
 
 @api_router.delete("/products/{product_id}")
@@ -992,19 +2211,89 @@ async def delete_product(product_id: str, current_user: dict = Depends(get_curre
     result = await db.products.delete_one({"id": product_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
+    await pdf_cache.invalidate(f"product:{product_id}")
     return {"message": "Product deleted successfully"}
 
+# Sequences: atomic counters in db.counters, one document per sequence key
+QUOTE_NUMBER_BLOCK = int(os.environ.get('QUOTE_NUMBER_BLOCK', 1))
+QUOTE_NUMBER_SEED_MARKER = "migration:quote_number_counters"
+
+class SequenceAllocator:
+    """
+    Hands out increasing integers per key with find_one_and_update + $inc.
+    With block_size > 1 each round-trip reserves a block that is served from memory;
+    numbers left in a block are skipped when the process restarts.
+    """
+
+    def __init__(self, block_size: int = 1):
+        self.block_size = max(1, block_size)
+        self._blocks = {}
+        self._locks = {}
+
+    def _take(self, key: str) -> Optional[int]:
+        block = self._blocks.get(key)
+        if block and block[0] <= block[1]:
+            value = block[0]
+            block[0] += 1
+            return value
+        return None
+
+    async def next(self, key: str) -> int:
+        value = self._take(key)
+        if value is not None:
+            return value
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            value = self._take(key)
+            if value is not None:
+                return value
+            counter = await db.counters.find_one_and_update(
+                {"_id": key},
+                {"$inc": {"seq": self.block_size}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            last = counter['seq']
+            first = last - self.block_size + 1
+            self._blocks[key] = [first + 1, last]
+            return first
+
+quote_numbers = SequenceAllocator(QUOTE_NUMBER_BLOCK)
+
+async def next_quote_number(username: str) -> str:
+    return f"FT-{await quote_numbers.next(f'quote_number:{username}'):05d}"
+
+async def seed_quote_number_counters():
+    # One-time: start each user's counter at their highest existing FT-xxxxx
+    if await db.counters.find_one({"_id": QUOTE_NUMBER_SEED_MARKER}):
+        return
+    highest = {}
+    async for quote in db.quotes.find({}, {"_id": 0, "user_id": 1, "quote_number": 1}):
+        try:
+            number = int(quote['quote_number'].split("-")[-1])
+        except (KeyError, AttributeError, ValueError):
+            continue
+        if number > highest.get(quote['user_id'], 0):
+            highest[quote['user_id']] = number
+    for user_id, number in highest.items():
+        # $max never moves a counter backwards, so this is safe next to live allocations
+        await db.counters.update_one({"_id": f"quote_number:{user_id}"}, {"$max": {"seq": number}}, upsert=True)
+    # Several workers may seed at once; the $max writes are idempotent and so is this upsert
+    await db.counters.update_one(
+        {"_id": QUOTE_NUMBER_SEED_MARKER},
+        {"$setOnInsert": {"done_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+    logger.info(f"Seeded quote number counters for {len(highest)} users")
+
 # Quote endpoints
 @api_router.post("/quotes", response_model=Quote)
 async def create_quote(quote: QuoteCreate, current_user: dict = Depends(get_current_user)):
-    # Get last quote number for this user
-    last_quote = await db.quotes.find_one({"user_id": current_user["username"]}, {"_id": 0, "quote_number": 1}, sort=[("created_at", -1)])
-    if last_quote and last_quote.get("quote_number"):
-        last_num = int(last_quote["quote_number"].split("-")[-1])
-        quote_number = f"FT-{last_num + 1:05d}"
-    else:
-        quote_number = "FT-00001"
+    quote_number = await next_quote_number(current_user["username"])
     
+    # Older clients still send inline data: URLs; keep only references in the quote
+    for item in quote.items:
+        item.product_image = await store_image_or_400(item.product_image)
+
     # Calculate totals
     subtotal = sum(item.subtotal for item in quote.items)
     
@@ -1020,8 +2309,8 @@ async def create_quote(quote: QuoteCreate, current_user: dict = Depends(get_curr
     quote_obj = Quote(
         user_id=current_user["username"],
         quote_number=quote_number,
-        quote_date=datetime.fromisoformat(quote.quote_date),
-        validity_date=datetime.fromisoformat(quote.validity_date),
+        quote_date=to_utc(datetime.fromisoformat(quote.quote_date)),
+        validity_date=to_utc(datetime.fromisoformat(quote.validity_date)),
         customer_name=quote.customer_name,
         customer_email=quote.customer_email,
         customer_phone=quote.customer_phone,
@@ -1038,317 +2327,687 @@ async def create_quote(quote: QuoteCreate, current_user: dict = Depends(get_curr
     )
     
     doc = quote_obj.model_dump()
-    doc['quote_date'] = doc['quote_date'].isoformat()
-    doc['validity_date'] = doc['validity_date'].isoformat()
-    doc['created_at'] = doc['created_at'].isoformat()
     
-    await db.quotes.insert_one(doc)
+    await begin_quote_stats(current_user["username"])
+    try:
+        # The unique (user_id, quote_number) index catches a counter that fell behind; skip ahead and retry
+        for attempt in range(3):
+            try:
+                await db.quotes.insert_one(doc)
+                break
+            except DuplicateKeyError:
+                if attempt == 2:
+                    raise HTTPException(status_code=409, detail="Could not allocate a quote number, please retry")
+                quote_obj.quote_number = await next_quote_number(current_user["username"])
+                doc['quote_number'] = quote_obj.quote_number
+    except BaseException:
+        await abort_quote_stats(current_user["username"])
+        raise
+    await apply_quote_stats(doc, 1)
     return quote_obj
 
+QUOTE_PAGE_MAX = 1000
+QUOTE_SORT_TYPES = {"created_at": datetime, "total": (int, float)}
+
 @api_router.get("/quotes", response_model=List[Quote])
-async def get_quotes(current_user: dict = Depends(get_current_user)):
-    quotes = await db.quotes.find({"user_id": current_user["username"]}, {"_id": 0}).to_list(1000)
-    for quote in quotes:
-        if isinstance(quote['quote_date'], str):
-            quote['quote_date'] = datetime.fromisoformat(quote['quote_date'])
-        if isinstance(quote['validity_date'], str):
-            quote['validity_date'] = datetime.fromisoformat(quote['validity_date'])
-        if isinstance(quote['created_at'], str):
-            quote['created_at'] = datetime.fromisoformat(quote['created_at'])
-    return quotes
+async def get_quotes(
+    sort: Literal["created_at", "total"] = "created_at",
+    order: Literal["asc", "desc"] = "desc",
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    currency: Optional[str] = None,
+    customer: Optional[str] = None,
+    summary: bool = False,
+    after: Optional[str] = None,
+    limit: int = Query(QUOTE_PAGE_MAX, ge=1, le=QUOTE_PAGE_MAX),
+    current_user: dict = Depends(get_current_user),
+):
+    query = {"user_id": current_user["username"]}
+    if date_from or date_to:
+        query['quote_date'] = {}
+        if date_from:
+            query['quote_date']['$gte'] = to_utc(date_from)
+        if date_to:
+            query['quote_date']['$lte'] = to_utc(date_to)
+    if currency:
+        query['currency'] = currency
+    if customer:
+        # Anchored prefix match on the customer name
+        query['customer_name'] = {"$regex": "^" + re.escape(customer), "$options": "i"}
+    total = await db.quotes.count_documents(query)
+
+    direction = -1 if order == "desc" else 1
+    if after:
+        value, last_id = decode_cursor(after, (QUOTE_SORT_TYPES[sort], str))
+        op = "$lt" if direction == -1 else "$gt"
+        query['$or'] = [
+            {sort: {op: value}},
+            {sort: value, "id": {op: last_id}},
+        ]
+
+    # Summary mode leaves out the line items, which dominate the payload
+    projection = {"_id": 0, "items": 0} if summary else {"_id": 0}
+    quotes = await db.quotes.find(query, projection) \
+        .sort([(sort, direction), ("id", direction)]).limit(limit).to_list(limit)
+
+    headers = {'X-Total-Count': str(total)}
+    if len(quotes) == limit:
+        last = quotes[-1]
+        headers['X-Next-Cursor'] = encode_cursor(last[sort], last['id'])
+    return FastJSONResponse(quotes, headers=headers)
 
 @api_router.get("/quotes/{quote_id}", response_model=Quote)
 async def get_quote(quote_id: str, current_user: dict = Depends(get_current_user)):
     quote = await db.quotes.find_one({"id": quote_id, "user_id": current_user["username"]}, {"_id": 0})
     if not quote:
         raise HTTPException(status_code=404, detail="Quote not found")
-    if isinstance(quote['quote_date'], str):
-        quote['quote_date'] = datetime.fromisoformat(quote['quote_date'])
-    if isinstance(quote['validity_date'], str):
-        quote['validity_date'] = datetime.fromisoformat(quote['validity_date'])
-    if isinstance(quote['created_at'], str):
-        quote['created_at'] = datetime.fromisoformat(quote['created_at'])
     return quote
 
 @api_router.delete("/quotes/{quote_id}")
 async def delete_quote(quote_id: str, current_user: dict = Depends(get_current_user)):
-    result = await db.quotes.delete_one({"id": quote_id, "user_id": current_user["username"]})
-    if result.deleted_count == 0:
+    await begin_quote_stats(current_user["username"])
+    try:
+        quote = await db.quotes.find_one_and_delete({"id": quote_id, "user_id": current_user["username"]}, {"_id": 0})
+    except BaseException:
+        await abort_quote_stats(current_user["username"])
+        raise
+    if not quote:
+        await abort_quote_stats(current_user["username"])
         raise HTTPException(status_code=404, detail="Quote not found")
+    await pdf_cache.invalidate(f"quote:{quote_id}")
+    await apply_quote_stats(quote, -1)
     return {"message": "Quote deleted successfully"}
 
+# Dashboard stats: one document per user in db.quote_stats, kept current with $inc on every
+# quote create/delete and rebuilt from an aggregation over db.quotes when missing or outdated.
+#   currencies.<CUR>           {count, revenue}
+#   months.<YYYY-MM>.<CUR>     {count, revenue}   (by quote_date, UTC)
+#   products.<id>              {name, totals.<CUR>: {quantity, subtotal}}
+# Group sales are derived when reading, from the products' current group.
+# Concurrency with rebuilds: every quote write is bracketed by begin_quote_stats (inflight +1) and
+# apply_quote_stats (delta, inflight -1), each bumping 'writes'. A rebuild only stores its aggregation
+# if 'writes' hasn't moved since it started and nothing is in flight, so no quote is counted twice or missed.
+QUOTE_STATS_VERSION = 1
+QUOTE_STATS_REBUILD_ATTEMPTS = 5
+# A write in flight for longer than this is assumed lost (worker died between quote write and delta)
+QUOTE_STATS_INFLIGHT_TIMEOUT = 60
+DASHBOARD_TOP_PRODUCTS = 10
+
+def stats_key(value) -> str:
+    # Field names can't contain '.' or start with '$'
+    return str(value).replace('.', '\uff0e').replace('$', '\uff04') or '-'
+
+def quote_stats_delta(quote: dict, sign: int) -> dict:
+    currency = stats_key(quote['currency'])
+    month = to_utc(quote['quote_date']).strftime('%Y-%m')
+    inc = {
+        "writes": 1,
+        "inflight": -1,
+        "quote_count": sign,
+        f"currencies.{currency}.count": sign,
+        f"currencies.{currency}.revenue": sign * quote['total'],
+        f"months.{month}.{currency}.count": sign,
+        f"months.{month}.{currency}.revenue": sign * quote['total'],
+    }
+    names = {}
+    for item in quote.get('items', []):
+        prefix = f"products.{stats_key(item['product_id'])}"
+        for field in ('quantity', 'subtotal'):
+            path = f"{prefix}.totals.{currency}.{field}"
+            inc[path] = inc.get(path, 0) + sign * item[field]
+        names[f"{prefix}.name"] = item['product_name']
+    return {"$inc": inc, "$set": {**names, "updated_at": datetime.now(timezone.utc)}}
+
+async def begin_quote_stats(user_id: str):
+    # Before the quote write. Creates a placeholder (skipped by readers, replaced by the next rebuild)
+    # for users without stats, so the write is visible to a rebuild that is already running
+    try:
+        await db.quote_stats.update_one(
+            {"_id": user_id},
+            {
+                "$inc": {"inflight": 1, "writes": 1},
+                "$max": {"inflight_at": datetime.now(timezone.utc)},
+                "$setOnInsert": {"version": QUOTE_STATS_VERSION, "building": True},
+            },
+            upsert=True,
+        )
+    except Exception as e:
+        logger.error(f"Quote stats update failed for {user_id}: {e}")
+
+async def abort_quote_stats(user_id: str):
+    # The quote write failed after begin_quote_stats
+    try:
+        await db.quote_stats.update_one({"_id": user_id}, {"$inc": {"inflight": -1, "writes": 1}})
+    except Exception as e:
+        logger.error(f"Quote stats update failed for {user_id}: {e}")
+
+async def apply_quote_stats(quote: dict, sign: int):
+    # After the quote write; a placeholder or outdated document takes the delta too and is replaced on rebuild
+    try:
+        await db.quote_stats.update_one({"_id": quote['user_id']}, quote_stats_delta(quote, sign))
+    except Exception as e:
+        # The quote change itself is saved; stale stats are fixed by GET /dashboard/stats?rebuild=true
+        logger.error(f"Quote stats update failed for {quote['user_id']}: {e}")
+
+async def rebuild_quote_stats(user_id: str) -> dict:
+    """
+    Recompute a user's stats from the quotes collection.
+    The result is only stored if no quote write started or finished while the aggregation ran
+    (see the section comment); otherwise the aggregation runs again.
+    """
+    # Make sure there is a document for quote writes to move the watermark on
+    await db.quote_stats.update_one(
+        {"_id": user_id},
+        {"$setOnInsert": {"version": QUOTE_STATS_VERSION, "building": True, "writes": 0}},
+        upsert=True,
+    )
+
+    for attempt in range(QUOTE_STATS_REBUILD_ATTEMPTS):
+        if attempt:
+            await asyncio.sleep(0.05 * attempt)  # give in-flight quote writes a moment to finish
+        current = await db.quote_stats.find_one({"_id": user_id}, {"writes": 1})
+        writes = (current or {}).get('writes', 0)
+        stats = await aggregate_quote_stats(user_id)
+        stats.update(writes=writes, inflight=0)
+        abandoned = datetime.now(timezone.utc) - timedelta(seconds=QUOTE_STATS_INFLIGHT_TIMEOUT)
+        result = await db.quote_stats.replace_one(
+            {
+                "_id": user_id,
+                "writes": writes,
+                "$or": [
+                    {"inflight": {"$exists": False}},
+                    {"inflight": {"$lte": 0}},
+                    {"inflight_at": {"$lt": abandoned}},
+                ],
+            },
+            stats,
+        )
+        if result.matched_count:
+            return stats
+    # Busy user: serve the fresh numbers; the document stays as it was and the next read retries
+    logger.warning(f"Quote stats rebuild for {user_id} kept racing with quote writes, not stored")
+    return stats
+
+async def aggregate_quote_stats(user_id: str) -> dict:
+    pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$facet": {
+            "currencies": [
+                {"$group": {"_id": "$currency", "count": {"$sum": 1}, "revenue": {"$sum": "$total"}}},
+            ],
+            "months": [
+                {"$group": {
+                    "_id": {"month": {"$dateToString": {"format": "%Y-%m", "date": "$quote_date"}}, "currency": "$currency"},
+                    "count": {"$sum": 1},
+                    "revenue": {"$sum": "$total"},
+                }},
+            ],
+            "products": [
+                {"$unwind": "$items"},
+                {"$group": {
+                    "_id": {"product_id": "$items.product_id", "currency": "$currency"},
+                    "name": {"$last": "$items.product_name"},
+                    "quantity": {"$sum": "$items.quantity"},
+                    "subtotal": {"$sum": "$items.subtotal"},
+                }},
+            ],
+        }},
+    ]
+    result = (await db.quotes.aggregate(pipeline).to_list(1))[0]
+
+    currencies = {stats_key(row['_id']): {"count": row['count'], "revenue": row['revenue']} for row in result['currencies']}
+    months = {}
+    for row in result['months']:
+        months.setdefault(row['_id']['month'], {})[stats_key(row['_id']['currency'])] = {
+            "count": row['count'], "revenue": row['revenue'],
+        }
+    products = {}
+    for row in result['products']:
+        product = products.setdefault(stats_key(row['_id']['product_id']), {"name": row['name'], "totals": {}})
+        product['totals'][stats_key(row['_id']['currency'])] = {"quantity": row['quantity'], "subtotal": row['subtotal']}
+
+    stats = {
+        "_id": user_id,
+        "version": QUOTE_STATS_VERSION,
+        "quote_count": sum(c['count'] for c in currencies.values()),
+        "currencies": currencies,
+        "months": months,
+        "products": products,
+        "updated_at": datetime.now(timezone.utc),
+    }
+    return stats
+
+@api_router.get("/dashboard/stats")
+async def get_dashboard_stats(
+    top: int = Query(DASHBOARD_TOP_PRODUCTS, ge=1, le=100),
+    rebuild: bool = False,
+    current_user: dict = Depends(get_current_user),
+):
+    user_id = current_user["username"]
+    stats = None if rebuild else await db.quote_stats.find_one(
+        {"_id": user_id, "version": QUOTE_STATS_VERSION, "building": {"$ne": True}}
+    )
+    if not stats:
+        stats = await rebuild_quote_stats(user_id)
+
+    # Deletes leave zeroed counters behind; hide them
+    currencies = {cur: c for cur, c in stats.get('currencies', {}).items() if c.get('count')}
+    months = [
+        {"month": month, "currency": cur, "count": c['count'], "revenue": c['revenue']}
+        for month, by_currency in sorted(stats.get('months', {}).items())
+        for cur, c in by_currency.items() if c.get('count')
+    ]
+
+    rows = [
+        {"product_id": pid, "product_name": p.get('name'), "currency": cur, **totals}
+        for pid, p in stats.get('products', {}).items()
+        for cur, totals in p.get('totals', {}).items() if round(totals.get('subtotal', 0), 6)
+    ]
+    groups_by_product = {
+        p['id']: p.get('group')
+        for p in await db.products.find(
+            {"id": {"$in": list({row['product_id'] for row in rows})}}, {"_id": 0, "id": 1, "group": 1}
+        ).to_list(None)
+    }
+    top_products, group_sales = {}, {}
+    for row in rows:
+        top_products.setdefault(row['currency'], []).append(row)
+        group = groups_by_product.get(row['product_id'])
+        sales = group_sales.setdefault(row['currency'], {}).setdefault(group, {"group": group, "quantity": 0, "subtotal": 0})
+        sales['quantity'] += row['quantity']
+        sales['subtotal'] += row['subtotal']
+
+    return FastJSONResponse({
+        "quote_count": stats.get('quote_count', 0),
+        "currencies": currencies,
+        "months": months,
+        "top_products": {
+            cur: sorted(items, key=lambda r: r['subtotal'], reverse=True)[:top] for cur, items in top_products.items()
+        },
+        "group_sales": {
+            cur: sorted(groups.values(), key=lambda g: g['subtotal'], reverse=True) for cur, groups in group_sales.items()
+        },
+        "updated_at": stats.get('updated_at'),
+    })
+
+# PDF render engine: ReportLab work runs in worker processes, never on the event loop
+PDF_RENDER_WORKERS = int(os.environ.get('PDF_RENDER_WORKERS', min(4, os.cpu_count() or 1)))
+PDF_RENDER_MAX_PENDING = int(os.environ.get('PDF_RENDER_MAX_PENDING', max(1, PDF_RENDER_WORKERS) * 4))
+PDF_RENDER_RETRY_AFTER = 2  # seconds
+
+PDF_QUOTE_FIELDS = (
+    'quote_number', 'quote_date', 'validity_date', 'customer_name', 'customer_email', 'customer_phone',
+    'currency', 'subtotal', 'discount_amount', 'vat_rate', 'vat_amount', 'total', 'notes',
+)
+PDF_ITEM_FIELDS = ('product_id', 'product_name', 'unit', 'quantity', 'unit_price', 'subtotal', 'display_text')
+PDF_SETTINGS_FIELDS = (
+    'company_name', 'company_address', 'company_phone', 'company_email', 'company_website', 'theme_color',
+)
+
+def quote_pdf_snapshot(quote: dict) -> dict:
+    # Only what the renderer reads; keeps product_image blobs out of the worker pipe
+    snapshot = {k: quote[k] for k in PDF_QUOTE_FIELDS if k in quote}
+    snapshot['items'] = [{k: item[k] for k in PDF_ITEM_FIELDS if k in item} for item in quote['items']]
+    return snapshot
+
+def settings_pdf_snapshot(entry: dict) -> Optional[dict]:
+    # Takes a load_settings() entry; the logo goes as the prepared JPEG rather than the base64 original
+    settings = entry['settings']
+    if not settings:
+        return None
+    snapshot = {k: settings[k] for k in PDF_SETTINGS_FIELDS if k in settings}
+    if entry['pdf_logo']:
+        snapshot['logo_jpeg'] = entry['pdf_logo']
+        snapshot['logo_digest'] = entry['pdf_logo_digest']
+    return snapshot
+
+class PDFRenderEngine:
+    """
+    Bounded process pool for quote PDFs.
+    At most max_pending renders are queued or running; beyond that callers get a 503 with Retry-After.
+    workers=0 renders in the default thread pool instead (useful for development).
+    """
+
+    def __init__(self, workers: int = PDF_RENDER_WORKERS, max_pending: int = PDF_RENDER_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rendered = 0
+        self.rejected = 0
+        self._executor = None
+
+    def _create_executor(self):
+        if self.workers <= 0:
+            return None
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=pdf_render.init_worker,
+        )
+
+    async def start(self):
+        self._executor = self._create_executor()
+        loop = asyncio.get_running_loop()
+        if self._executor is None:
+            await loop.run_in_executor(None, lambda: get_pdf_context().warm_up())
+            return
+        # The pool forks lazily; one task per worker spawns every process (running its warm-up) now
+        await asyncio.gather(*(
+            loop.run_in_executor(self._executor, pdf_render.worker_ready)
+            for _ in range(self.workers)
+        ))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def render(self, quote: dict, settings: Optional[dict], product_groups: dict) -> bytes:
+        # Expects the quote_pdf_snapshot/settings_pdf_snapshot forms
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="PDF renderer is busy, please retry",
+                headers={"Retry-After": str(PDF_RENDER_RETRY_AFTER)},
+            )
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            try:
+                pdf_bytes = await loop.run_in_executor(
+                    self._executor, render_quote_pdf,
+                    quote, settings, product_groups,
+                )
+            except BrokenProcessPool:
+                logger.error("PDF worker pool died, restarting")
+                self.shutdown()
+                self._executor = self._create_executor()
+                raise HTTPException(
+                    status_code=503,
+                    detail="PDF renderer restarting, please retry",
+                    headers={"Retry-After": str(PDF_RENDER_RETRY_AFTER)},
+                )
+            self.rendered += 1
+            return pdf_bytes
+        finally:
+            self.pending -= 1
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "pending": self.pending, "rendered": self.rendered, "rejected": self.rejected}
+
+pdf_engine = PDFRenderEngine()
+
+# PDF cache: rendered quotes keyed by a hash of every render input
+PDF_CACHE_MAX_BYTES = int(os.environ.get('PDF_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+PDF_CACHE_DIR = os.environ.get('PDF_CACHE_DIR')
+PDF_CACHE_DISK_MAX_BYTES = int(os.environ.get('PDF_CACHE_DISK_MAX_BYTES', 512 * 1024 * 1024))
+
+class PDFCache:
+    """
+    Content-addressed LRU cache for rendered quote PDFs.
+    Entries are tagged (quote:<id>, user:<username>, product:<id>) so writes to any input can drop them eagerly.
+    Entries evicted from memory spill to PDF_CACHE_DIR when it is set.
+    """
+
+    def __init__(self, max_bytes: int = PDF_CACHE_MAX_BYTES, disk_dir: Optional[str] = PDF_CACHE_DIR,
+                 disk_max_bytes: int = PDF_CACHE_DISK_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._key_tags = {}
+        self._disk_dir = Path(disk_dir) if disk_dir else None
+        self._disk_max_bytes = disk_max_bytes
+        self._disk_entries = OrderedDict()
+        self._disk_size = 0
+        if self._disk_dir:
+            self._disk_dir.mkdir(parents=True, exist_ok=True)
+            # Re-index files left by a previous process, oldest first
+            for path in sorted(self._disk_dir.glob('*.pdf'), key=lambda p: p.stat().st_mtime):
+                size = path.stat().st_size
+                self._disk_entries[path.stem] = size
+                self._disk_size += size
+
+    @staticmethod
+    def make_key(quote: dict, settings: Optional[dict], product_groups: dict) -> str:
+        if settings and 'logo_jpeg' in settings:
+            # logo_digest stands in for the image bytes
+            settings = {k: v for k, v in settings.items() if k != 'logo_jpeg'}
+        payload = json.dumps([quote, settings, product_groups], sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        data = self._entries.get(key)
+        if data is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+        if key in self._disk_entries:
+            try:
+                data = await anyio.to_thread.run_sync(self._path(key).read_bytes)
+            except OSError:
+                self._drop_disk(key)
+            else:
+                if key in self._disk_entries:
+                    self._disk_entries.move_to_end(key)
+                self.hits += 1
+                return data
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, data: bytes, tags=()):
+        if key in self._entries or len(data) > self.max_bytes:
+            return
+        self._entries[key] = data
+        self.size += len(data)
+        self._key_tags[key] = set(tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        spilled = []
+        while self.size > self.max_bytes:
+            old_key, old_data = self._entries.popitem(last=False)
+            self.size -= len(old_data)
+            spilled.append((old_key, old_data))
+        for old_key, old_data in spilled:
+            await self._spill(old_key, old_data)
+
+    async def invalidate(self, tag: str):
+        removed = []
+        for key in self._tags.pop(tag, ()):
+            data = self._entries.pop(key, None)
+            if data is not None:
+                self.size -= len(data)
+            if self._drop_disk(key):
+                removed.append(key)
+            for other in self._key_tags.pop(key, ()):
+                if other != tag and other in self._tags:
+                    self._tags[other].discard(key)
+                    if not self._tags[other]:
+                        del self._tags[other]
+        if removed:
+            await anyio.to_thread.run_sync(self._remove_files, removed)
+
+    def _path(self, key: str) -> Path:
+        return self._disk_dir / f"{key}.pdf"
+
+    async def _spill(self, key: str, data: bytes):
+        # File I/O runs in a worker thread; the index is only touched on the event loop
+        if not self._disk_dir:
+            self._forget(key)
+            return
+        try:
+            await anyio.to_thread.run_sync(self._path(key).write_bytes, data)
+        except OSError as e:
+            logger.warning(f"PDF cache spill failed: {e}")
+            self._forget(key)
+            return
+        if key not in self._key_tags:
+            # Invalidated while the file was being written
+            await anyio.to_thread.run_sync(self._remove_files, [key])
+            return
+        self._disk_entries[key] = len(data)
+        self._disk_size += len(data)
+        evicted = []
+        while self._disk_size > self._disk_max_bytes and self._disk_entries:
+            old_key = next(iter(self._disk_entries))
+            self._drop_disk(old_key)
+            self._forget(old_key)
+            evicted.append(old_key)
+        if evicted:
+            await anyio.to_thread.run_sync(self._remove_files, evicted)
+
+    def _drop_disk(self, key: str) -> bool:
+        # Index only; callers remove the file with _remove_files, off the event loop
+        size = self._disk_entries.pop(key, None)
+        if size is None:
+            return False
+        self._disk_size -= size
+        return True
+
+    def _remove_files(self, keys):
+        for key in keys:
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries), "bytes": self.size, "hits": self.hits, "misses": self.misses,
+            "disk_entries": len(self._disk_entries), "disk_bytes": self._disk_size,
+        }
+
+    def _forget(self, key: str):
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+pdf_cache = PDFCache()
+
 @api_router.get("/quotes/{quote_id}/pdf")
 async def get_quote_pdf(quote_id: str, current_user: dict = Depends(get_current_user)):
     quote = await db.quotes.find_one({"id": quote_id, "user_id": current_user["username"]}, {"_id": 0})
     if not quote:
         raise HTTPException(status_code=404, detail="Quote not found")
-    
-    settings = await db.settings.find_one({"user_id": current_user["username"]}, {"_id": 0})
-    
-    # Convert datetime strings
-    if isinstance(quote['quote_date'], str):
-        quote['quote_date'] = datetime.fromisoformat(quote['quote_date'])
-    if isinstance(quote['validity_date'], str):
-        quote['validity_date'] = datetime.fromisoformat(quote['validity_date'])
-    
-    # Generate PDF
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=2*cm, bottomMargin=2*cm, leftMargin=2*cm, rightMargin=2*cm)
-    story = []
-    
-    # Register Turkish-compatible fonts
-    try:
-        pdfmetrics.registerFont(TTFont('DejaVuSans', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'))
-        pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'))
-        font_name = 'DejaVuSans'
-        font_bold = 'DejaVuSans-Bold'
-    except:
-        # Fallback to Helvetica if DejaVu not available
-        font_name = 'Helvetica'
-        font_bold = 'Helvetica-Bold'
-    
-    # Get theme color from settings (hex color format)
-    theme_color = settings.get('theme_color', '#4F46E5') if settings else '#4F46E5'
-    
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontName=font_bold, fontSize=20, textColor=colors.HexColor(theme_color), spaceAfter=12)
-    heading_style = ParagraphStyle('CustomHeading', parent=styles['Heading2'], fontName=font_bold, fontSize=12, textColor=colors.HexColor('#374151'), spaceAfter=6)
-    normal_style = ParagraphStyle('CustomNormal', parent=styles['Normal'], fontName=font_name, fontSize=9, textColor=colors.HexColor('#4b5563'))
-    
-    # Logo and company info header
-    header_data = []
-    
-    # Company info section
-    if settings:
-        company_info = []
-        if settings.get('company_name'):
-            company_info.append([Paragraph(settings['company_name'], title_style)])
-        if settings.get('company_address'):
-            company_info.append([Paragraph(settings['company_address'], normal_style)])
-        
-        contact_info = []
-        if settings.get('company_phone'):
-            contact_info.append(f"Tel: {settings['company_phone']}")
-        if settings.get('company_email'):
-            contact_info.append(f"E-posta: {settings['company_email']}")
-        if settings.get('company_website'):
-            contact_info.append(f"Web: {settings['company_website']}")
-        
-        if contact_info:
-            company_info.append([Paragraph(" | ".join(contact_info), normal_style)])
-        
-        # Create header layout
-        if settings.get('logo'):
-            try:
-                logo_data = base64.b64decode(settings['logo'].split(',')[1] if ',' in settings['logo'] else settings['logo'])
-                logo_img = RLImage(io.BytesIO(logo_data), width=4*cm, height=3*cm)
-                
-                # Create header table with logo and company info side by side
-                header_table_data = [[logo_img, company_info]]
-                header_table = Table(header_table_data, colWidths=[5*cm, 11*cm])
-                header_table.setStyle(TableStyle([
-                    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                    ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-                    ('ALIGN', (1, 0), (1, 0), 'LEFT'),
-                    ('LEFTPADDING', (1, 0), (1, 0), 20),
-                ]))
-                story.append(header_table)
-            except:
-                # If logo fails, just add company info
-                for info in company_info:
-                    story.append(info[0])
-        else:
-            # No logo, just company info
-            for info in company_info:
-                story.append(info[0])
-    else:
-        story.append(Paragraph("Firma Adı", title_style))
-    
-    story.append(Spacer(1, 0.8*cm))
-    
-    # Quote title
-    quote_title = Paragraph("FİYAT TEKLİFİ", 
-                           ParagraphStyle('QuoteTitle', parent=title_style, 
-                                        fontSize=24, textColor=colors.HexColor(theme_color), 
-                                        alignment=1, spaceAfter=20))
-    story.append(quote_title)
-    story.append(Spacer(1, 0.5*cm))
-    
-    # Quote info
-    info_data = [
-        ["Teklif No:", quote['quote_number'], "Müşteri:", quote['customer_name']],
-        ["Tarih:", quote['quote_date'].strftime('%d.%m.%Y'), "E-posta:", quote['customer_email']],
-        ["Geçerlilik:", quote['validity_date'].strftime('%d.%m.%Y'), "Telefon:", quote.get('customer_phone', '-')]
-    ]
-    
-    info_table = Table(info_data, colWidths=[3*cm, 5*cm, 3*cm, 5*cm])
-    info_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), font_name),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#6b7280')),
-        ('TEXTCOLOR', (2, 0), (2, -1), colors.HexColor('#6b7280')),
-        ('TEXTCOLOR', (1, 0), (1, -1), colors.HexColor('#111827')),
-        ('TEXTCOLOR', (3, 0), (3, -1), colors.HexColor('#111827')),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
-    story.append(info_table)
-    story.append(Spacer(1, 0.5*cm))
-    
-    # Items table - first get all products for lookup
-    all_products = await db.products.find({}, {"_id": 0}).to_list(1000)
-    product_lookup = {p['id']: p for p in all_products}
-    
-    # Group items by product group
-    grouped_items = {}
-    for item in quote['items']:
-        product = product_lookup.get(item['product_id'])
-        group_name = product.get('group') if product else None
-        
-        if group_name:
-            if group_name not in grouped_items:
-                grouped_items[group_name] = []
-            grouped_items[group_name].append(item)
-        else:
-            if 'Diğer' not in grouped_items:
-                grouped_items['Diğer'] = []
-            grouped_items['Diğer'].append(item)
-    
-    # Add items grouped by group
-    for group_name in sorted(grouped_items.keys()):
-        # Add group header as separate paragraph
-        group_style = ParagraphStyle('GroupHeader', parent=styles['Heading3'], 
-                                     fontSize=11, textColor=colors.HexColor(theme_color),
-                                     fontName=font_bold, spaceBefore=8, spaceAfter=4,
-                                     leftIndent=0)
-        group_header = Paragraph(f"<b>▸ {group_name}</b>", group_style)
-        story.append(group_header)
-        
-        # Create table for this group
-        table_data = [['Ürün Adı', 'Birim', 'Koli/PK', 'Birim Fiyat', 'Miktar', 'Tutar']]
-        
-        # Add items in this group
-        for item in grouped_items[group_name]:
-            # Get product details
-            product = product_lookup.get(item['product_id'])
-            
-            # Calculate package count and actual quantity
-            package_count = "-"
-            actual_quantity = item['quantity']
-            unit = item['unit']
-            
-            # Format quantity display and extract package count
-            if item.get('display_text'):
-                # Example: "2 paket (100 m²)" or "2 Paket (100 Metre)"
-                display_text_lower = item['display_text'].lower()
-                
-                if 'paket' in display_text_lower:
-                    # Extract package count
-                    package_part = item['display_text'].split('paket')[0].strip()
-                    package_part = package_part.split('Paket')[0].strip()  # Case-insensitive
-                    try:
-                        package_count = str(int(float(package_part)))
-                    except Exception as e:
-                        print(f"Error parsing package count from '{item['display_text']}': {e}")
-                        package_count = package_part if package_part else "-"
-                    
-                    # Extract calculated amount in parentheses
-                    if '(' in item['display_text'] and ')' in item['display_text']:
-                        calc_part = item['display_text'].split('(')[1].split(')')[0]
-                        actual_quantity = calc_part.split(' ')[0]
-                    else:
-                        actual_quantity = str(item['quantity'])
-                else:
-                    # No package-based, just show quantity
-                    actual_quantity = str(item['quantity'])
-            else:
-                # No display_text, just show quantity
-                actual_quantity = str(item['quantity'])
-            
-            print(f"DEBUG PDF: product={item.get('product_name')}, display_text='{item.get('display_text')}', package_count={package_count}, actual_quantity={actual_quantity}")
-            
-            table_data.append([
-                item['product_name'],  # Full product name, no truncation
-                unit,
-                package_count,  # Changed from package_info to package_count
-                f"{item['unit_price']:.2f}",
-                actual_quantity,
-                f"{item['subtotal']:.2f} {quote['currency']}"
-            ])
-        
-        # Create table for this group
-        items_table = Table(table_data, colWidths=[7*cm, 1.8*cm, 1.8*cm, 2.2*cm, 2.2*cm, 2.5*cm])
-        items_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(theme_color)),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (1, 0), (1, -1), 'CENTER'),   # Birim column centered
-            ('ALIGN', (2, 0), (2, -1), 'CENTER'),   # Koli/PK column centered
-            ('ALIGN', (3, 0), (3, -1), 'RIGHT'),    # Birim Fiyat column right
-            ('ALIGN', (4, 0), (4, -1), 'CENTER'),   # Miktar column centered
-            ('ALIGN', (5, 0), (5, -1), 'RIGHT'),    # Tutar column right aligned
-            ('FONTNAME', (0, 0), (-1, 0), font_bold),
-            ('FONTSIZE', (0, 0), (-1, 0), 8),       # Header font size
-            ('FONTNAME', (0, 1), (-1, -1), font_name),
-            ('FONTSIZE', (0, 1), (-1, -1), 7),      # Content font size
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f9fafb')]),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#d1d5db')),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('LEFTPADDING', (0, 0), (-1, -1), 4),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-            # Allow text wrapping in product name column for long names
-            ('WORDWRAP', (0, 1), (0, -1), 'CJK'),
-        ]))
-        story.append(items_table)
-        story.append(Spacer(1, 0.2*cm))
-    
-    # Totals
-    totals_data = [
-        ['Ara Toplam:', f"{quote['subtotal']:.2f} {quote['currency']}"]
-    ]
-    
-    # İndirim varsa ekle
-    if quote['discount_amount'] > 0:
-        totals_data.append(['İndirim:', f"-{quote['discount_amount']:.2f} {quote['currency']}"])
-    
-    # KDV varsa ekle
-    if quote['vat_amount'] > 0:
-        totals_data.append(['KDV (%{:.0f})'.format(quote['vat_rate']), f"{quote['vat_amount']:.2f} {quote['currency']}"])
-    
-    totals_data.append(['GENEL TOPLAM:', f"{quote['total']:.2f} {quote['currency']}"])
-    
-    totals_table = Table(totals_data, colWidths=[13*cm, 3*cm])
-    totals_table.setStyle(TableStyle([
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('FONTNAME', (0, 0), (-1, 2), font_name),
-        ('FONTSIZE', (0, 0), (-1, 2), 9),
-        ('FONTNAME', (0, 3), (-1, 3), font_bold),
-        ('FONTSIZE', (0, 3), (-1, 3), 11),
-        ('TEXTCOLOR', (0, 3), (-1, 3), colors.HexColor(theme_color)),
-        ('LINEABOVE', (0, 3), (-1, 3), 1.5, colors.HexColor(theme_color)),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
-    story.append(totals_table)
-    
-    if quote.get('notes'):
-        story.append(Spacer(1, 0.5*cm))
-        story.append(Paragraph("<b>Notlar:</b>", heading_style))
-        story.append(Paragraph(quote['notes'], normal_style))
-    
-    doc.build(story)
-    buffer.seek(0)
-    
+
+    settings_entry = await load_settings(current_user["username"])
+
+    # Not-yet-migrated quotes still hold strings; strftime needs datetimes
+    decode_datetimes(quote, ('quote_date', 'validity_date'))
+
+    # Items table - look up groups for the quoted products only
+    product_ids = {item['product_id'] for item in quote['items']}
+    product_lookup = {}
+    if product_ids:
+        async for p in db.products.find({"id": {"$in": list(product_ids)}}, {"_id": 0, "id": 1, "group": 1}):
+            product_lookup[p['id']] = p.get('group')
+    product_groups = {pid: product_lookup.get(pid) for pid in product_ids}
+
+    quote_snapshot = quote_pdf_snapshot(quote)
+    settings_snapshot = settings_pdf_snapshot(settings_entry)
+    cache_key = PDFCache.make_key(quote_snapshot, settings_snapshot, product_groups)
+    pdf_bytes = await pdf_cache.get(cache_key)
+    if pdf_bytes is None:
+        pdf_bytes = await pdf_engine.render(quote_snapshot, settings_snapshot, product_groups)
+        tags = [f"quote:{quote_id}", f"user:{current_user['username']}"]
+        tags.extend(f"product:{pid}" for pid in product_ids)
+        await pdf_cache.put(cache_key, pdf_bytes, tags)
+
     return StreamingResponse(
-        buffer,
+        io.BytesIO(pdf_bytes),
         media_type="application/pdf",
         headers={"Content-Disposition": f"attachment; filename=teklif_{quote['quote_number']}.pdf"}
     )
 
+# Settings cache: each user's settings document, plus the logo already prepared for PDFs
+SETTINGS_CACHE_TTL = float(os.environ.get('SETTINGS_CACHE_TTL', 60))  # seconds
+SETTINGS_CACHE_MAX_ENTRIES = int(os.environ.get('SETTINGS_CACHE_MAX_ENTRIES', 1000))
+PDF_LOGO_MAX_SIZE = (472, 354)  # the 4 x 3 cm logo box at 300 dpi
+
+def prepare_pdf_logo(logo: Optional[str]) -> Optional[bytes]:
+    # Decode the base64 logo once, shrink it to print size and flatten it to JPEG, which ReportLab embeds as-is
+    if not logo:
+        return None
+    try:
+        raw = base64.b64decode(logo.split(',')[1] if ',' in logo else logo)
+        with PILImage.open(io.BytesIO(raw)) as img:
+            img.thumbnail(PDF_LOGO_MAX_SIZE)
+            img = img.convert('RGBA')
+            flattened = PILImage.new('RGB', img.size, (255, 255, 255))
+            flattened.paste(img, mask=img.getchannel('A'))
+            out = io.BytesIO()
+            flattened.save(out, format='JPEG', quality=90)
+            return out.getvalue()
+    except Exception as e:
+        logger.warning(f"Could not prepare logo for PDFs: {e}")
+        return None
+
+class SettingsCache:
+    """
+    Bounded LRU of settings entries keyed by username, with a TTL for writes made by other processes.
+    An entry is {"settings": doc or None, "pdf_logo": JPEG bytes or None, "pdf_logo_digest": str or None}.
+    update_settings replaces the entry right after its write.
+    """
+
+    def __init__(self, ttl: float = SETTINGS_CACHE_TTL, max_entries: int = SETTINGS_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, username: str) -> Optional[dict]:
+        entry = self._entries.get(username)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(username)
+                self.hits += 1
+                return value
+            del self._entries[username]
+        self.misses += 1
+        return None
+
+    def put(self, username: str, value: dict):
+        self._entries.pop(username, None)
+        self._entries[username] = (time.monotonic() + self.ttl, value)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, username: str):
+        self._entries.pop(username, None)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+settings_cache = SettingsCache()
+
+async def load_settings(username: str, settings: Optional[dict] = None) -> dict:
+    """Cached settings entry for a user; pass settings to cache a document that was just written."""
+    if settings is None:
+        entry = settings_cache.get(username)
+        if entry is not None:
+            return entry
+        settings = await db.settings.find_one({"user_id": username}, {"_id": 0})
+    pdf_logo = await asyncio.to_thread(prepare_pdf_logo, settings.get('logo')) if settings else None
+    entry = {
+        "settings": settings,
+        "pdf_logo": pdf_logo,
+        "pdf_logo_digest": hashlib.sha256(pdf_logo).hexdigest() if pdf_logo else None,
+    }
+    settings_cache.put(username, entry)
+    return entry
+
 # Settings endpoints
 @api_router.get("/settings", response_model=Settings)
 async def get_settings(current_user: dict = Depends(get_current_user)):
-    settings = await db.settings.find_one({"user_id": current_user["username"]}, {"_id": 0})
+    settings = (await load_settings(current_user["username"]))['settings']
     if not settings:
         # Create default settings for this user
         default_settings = Settings(
@@ -1360,40 +3019,165 @@ async def get_settings(current_user: dict = Depends(get_current_user)):
             company_email="info@firma.com",
             company_website="www.firma.com"
         )
-        doc = default_settings.model_dump()
-        doc['updated_at'] = doc['updated_at'].isoformat()
-        await db.settings.insert_one(doc)
-        return default_settings
+        defaults = default_settings.model_dump(exclude={"user_id"})
+        # Upsert, not insert: concurrent first loads (e.g. StrictMode's double effect) all get the one document
+        settings = await db.settings.find_one_and_update(
+            {"user_id": current_user["username"]},
+            {"$setOnInsert": defaults},
+            projection={"_id": 0},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        await load_settings(current_user["username"], settings)
     
-    if isinstance(settings['updated_at'], str):
-        settings['updated_at'] = datetime.fromisoformat(settings['updated_at'])
     return settings
 
 @api_router.put("/settings", response_model=Settings)
 async def update_settings(settings_update: SettingsUpdate, current_user: dict = Depends(get_current_user)):
     update_data = {k: v for k, v in settings_update.model_dump().items() if v is not None}
-    update_data['updated_at'] = datetime.now(timezone.utc).isoformat()
-    
-    # Check if settings exist for this user
-    existing = await db.settings.find_one({"user_id": current_user["username"]}, {"_id": 0})
-    if not existing:
-        # Create new settings for this user
-        update_data['id'] = str(uuid.uuid4())
-        update_data['user_id'] = current_user["username"]
-        if 'company_name' not in update_data:
-            update_data['company_name'] = "Firma Adı"
-        await db.settings.insert_one(update_data)
-    else:
-        await db.settings.update_one(
-            {"user_id": current_user["username"]},
-            {"$set": update_data}
-        )
+    update_data['updated_at'] = datetime.now(timezone.utc)
+    
+    # Create the settings for this user on first save; user_id comes from the filter
+    on_insert = {"id": str(uuid.uuid4())}
+    if 'company_name' not in update_data:
+        on_insert['company_name'] = "Firma Adı"
+    settings = await db.settings.find_one_and_update(
+        {"user_id": current_user["username"]},
+        {"$set": update_data, "$setOnInsert": on_insert},
+        projection={"_id": 0},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    await pdf_cache.invalidate(f"user:{current_user['username']}")
     
-    settings = await db.settings.find_one({"user_id": current_user["username"]}, {"_id": 0})
-    if isinstance(settings['updated_at'], str):
-        settings['updated_at'] = datetime.fromisoformat(settings['updated_at'])
+    # Write-through: the next settings read or PDF export starts from the new document and logo
+    await load_settings(current_user["username"], settings)
     return settings
 
+@api_router.get("/admin/cache-stats")
+async def get_cache_stats(current_user: dict = Depends(get_admin_user)):
+    return {
+        "users": user_cache.stats(),
+        "settings": settings_cache.stats(),
+        "pdf_cache": pdf_cache.stats(),
+        "pdf_engine": pdf_engine.stats(),
+        "password_hashing": password_hasher.stats(),
+    }
+
+# Index bootstrap: every index the queries above rely on, declared in one place
+def _index(keys, name, **kwargs) -> IndexModel:
+    return IndexModel(keys, name=name, **kwargs)
+
+INDEX_SPECS = {
+    "users": [
+        _index([("username", 1)], "username_unique", unique=True),
+        _index([("id", 1)], "id_unique", unique=True),
+    ],
+    "roles": [
+        _index([("id", 1)], "id_unique", unique=True),
+        _index([("name", 1)], "name_unique", unique=True),
+    ],
+    "categories": [
+        _index([("id", 1)], "id_unique", unique=True),
+        _index([("name", 1)], "name_unique", unique=True),
+    ],
+    "groups": [
+        _index([("id", 1)], "id_unique", unique=True),
+        _index([("name", 1)], "name_unique", unique=True),
+    ],
+    "products": [
+        _index([("id", 1)], "id_unique", unique=True),
+        _index([("created_at", 1), ("id", 1)], "created_at_id"),
+        _index([("category", 1), ("created_at", 1), ("id", 1)], "category_created_at_id"),
+        _index([("group", 1), ("created_at", 1), ("id", 1)], "group_created_at_id"),
+    ],
+    "quotes": [
+        _index([("id", 1)], "id_unique", unique=True),
+        _index([("user_id", 1), ("quote_number", 1)], "user_id_quote_number_unique", unique=True),
+        _index([("user_id", 1), ("created_at", -1), ("id", -1)], "user_id_created_at_id"),
+        _index([("user_id", 1), ("total", -1), ("id", -1)], "user_id_total_id"),
+        _index([("user_id", 1), ("quote_date", -1)], "user_id_quote_date"),
+    ],
+    "customers": [
+        _index([("id", 1)], "id_unique", unique=True),
+        _index([("user_id", 1)], "user_id"),
+        _index([("user_id", 1), ("search.name", 1)], "user_id_search_name"),
+        _index([("user_id", 1), ("search.company", 1)], "user_id_search_company"),
+        _index([("user_id", 1), ("search.email", 1)], "user_id_search_email"),
+        _index([("user_id", 1), ("search.phone", 1)], "user_id_search_phone"),
+    ],
+    "reminders": [
+        _index([("id", 1)], "id_unique", unique=True),
+        _index([("user_id", 1), ("reminder_datetime", 1)], "user_id_reminder_datetime"),
+        _index([("user_id", 1), ("is_completed", 1), ("reminder_datetime", 1)], "user_id_is_completed_reminder_datetime"),
+        _index([("is_completed", 1), ("reminder_datetime", 1)], "is_completed_reminder_datetime"),
+    ],
+    "contact_channels": [
+        _index([("id", 1)], "id_unique", unique=True),
+        _index([("user_id", 1), ("order", 1)], "user_id_order"),
+    ],
+    "settings": [
+        _index([("user_id", 1)], "user_id_unique", unique=True),
+    ],
+    "channel_sessions": [
+        _index([("channel_id", 1)], "channel_id_unique", unique=True),
+    ],
+}
+
+class IndexManager:
+    """
+    Creates the declared indexes idempotently (create_index is a no-op when the index exists)
+    and reports drift: declared-but-missing, failed, and present-but-unused indexes.
+    """
+
+    def __init__(self, specs: dict):
+        self.specs = specs
+        self.errors = {}
+
+    async def ensure_all(self):
+        created = 0
+        for collection, models in self.specs.items():
+            for model in models:
+                name = model.document['name']
+                try:
+                    await db[collection].create_indexes([model])
+                    self.errors.pop((collection, name), None)
+                    created += 1
+                except OperationFailure as e:
+                    # Typically existing duplicates under a unique index; keep going with the rest
+                    self.errors[(collection, name)] = str(e)
+                    logger.error(f"Index {collection}.{name} not created: {e}")
+        logger.info(f"Index bootstrap finished: {created} ensured, {len(self.errors)} failed")
+
+    async def report(self) -> dict:
+        report = {}
+        for collection, models in self.specs.items():
+            existing = {}
+            async for index in db[collection].list_indexes():
+                existing[index['name']] = index
+            usage = {}
+            try:
+                async for stat in db[collection].aggregate([{"$indexStats": {}}]):
+                    usage[stat['name']] = stat['accesses']['ops']
+            except OperationFailure:
+                usage = None  # $indexStats needs clusterMonitor privileges
+            declared = [model.document['name'] for model in models]
+            report[collection] = {
+                "missing": [name for name in declared if name not in existing],
+                "failed": {name: error for (coll, name), error in self.errors.items() if coll == collection},
+                "unused": None if usage is None else sorted(
+                    name for name in existing if name != "_id_" and usage.get(name, 0) == 0
+                ),
+                "undeclared": sorted(name for name in existing if name != "_id_" and name not in declared),
+            }
+        return report
+
+index_manager = IndexManager(INDEX_SPECS)
+
+@api_router.get("/admin/indexes")
+async def get_index_report(current_user: dict = Depends(get_admin_user)):
+    return await index_manager.report()
+
 app.include_router(api_router)
 
 app.add_middleware(
@@ -1402,6 +3186,7 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor"],
 )
 
 logging.basicConfig(
@@ -1410,6 +3195,54 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Keep references to fire-and-forget tasks so they aren't garbage collected mid-run
+background_tasks = set()
+
+def _background_task_done(task: asyncio.Task):
+    background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Background task {task.get_name()} failed", exc_info=task.exception())
+
+def spawn_background(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(_background_task_done)
+    return task
+
+@app.on_event("startup")
+async def start_pdf_engine():
+    # Spawn every PDF worker (each loads fonts and renders a warm-up quote) before the first quote export
+    await pdf_engine.start()
+
+@app.on_event("startup")
+async def prepare_quote_numbers():
+    # Seed before serving so the first allocation can't reuse an existing number
+    await seed_quote_number_counters()
+
+@app.on_event("startup")
+async def bootstrap_indexes():
+    spawn_background(index_manager.ensure_all())
+
+@app.on_event("startup")
+async def run_background_migrations():
+    spawn_background(migrate_inline_images())
+    spawn_background(migrate_datetime_fields())
+    spawn_background(migrate_customer_search_fields())
+
+@app.on_event("startup")
+async def start_proxy_clients():
+    proxy_clients.start()
+    channel_cookies.start()
+
+@app.on_event("startup")
+async def start_reminder_scheduler():
+    await reminder_scheduler.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    reminder_scheduler.stop()
+    await proxy_clients.close()
+    await channel_cookies.close()
+    pdf_engine.shutdown()
+    password_hasher.shutdown()
     client.close()
\ No newline at end of file
@@ -4,3 +4,11 @@ import { twMerge } from "tailwind-merge"
 export function cn(...inputs) {
   return twMerge(clsx(inputs));
 }
+
+// Image references stored by the backend ("/api/images/<hash>") are relative to the API host
+export function imageSrc(src) {
+  if (src && src.startsWith("/api/")) {
+    return `${process.env.REACT_APP_BACKEND_URL}${src}`;
+  }
+  return src;
+}
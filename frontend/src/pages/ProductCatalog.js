@@ -1,5 +1,6 @@
 import { useState, useEffect } from "react";
 import axios from "axios";
+import { imageSrc } from "@/lib/utils";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Badge } from "@/components/ui/badge";
 import { Input } from "@/components/ui/input";
@@ -132,8 +133,8 @@ export default function ProductCatalog() {
             <Card key={product.id} className="hover:shadow-lg transition-shadow">
               <CardHeader className="pb-3">
                 <div className="aspect-square bg-gray-100 rounded-lg mb-3 overflow-hidden">
-                  {product.image ? (
-                    <img src={product.image} alt={product.name} className="w-full h-full object-cover" />
+                  {(product.image_thumbnail || product.image) ? (
+                    <img src={imageSrc(product.image_thumbnail || product.image)} alt={product.name} className="w-full h-full object-cover" />
                   ) : (
                     <div className="w-full h-full flex items-center justify-center text-gray-400">
                       <span>Görsel Yok</span>
@@ -177,8 +178,8 @@ export default function ProductCatalog() {
           {filteredProducts.map(product => (
             <div key={product.id} className="grid grid-cols-6 gap-4 p-4 border-b border-gray-100 hover:bg-gray-50 items-center">
               <div className="flex items-center gap-3">
-                {product.image && (
-                  <img src={product.image} alt={product.name} className="h-12 w-12 object-cover rounded" />
+                {(product.image_thumbnail || product.image) && (
+                  <img src={imageSrc(product.image_thumbnail || product.image)} alt={product.name} className="h-12 w-12 object-cover rounded" />
                 )}
                 <div>
                   <div className="font-medium">{product.name}</div>
@@ -1,5 +1,6 @@
 import { useState, useEffect } from "react";
 import axios from "axios";
+import { imageSrc } from "@/lib/utils";
 import { Button } from "@/components/ui/button";
 import { Input } from "@/components/ui/input";
 import { Label } from "@/components/ui/label";
@@ -84,8 +85,10 @@ export default function Products() {
   const fetchProducts = async () => {
     try {
       const token = localStorage.getItem('token');
+      // The edit form round-trips every field, so ask for the full documents
       const response = await axios.get(`${API}/products`, {
-        headers: { Authorization: `Bearer ${token}` }
+        headers: { Authorization: `Bearer ${token}` },
+        params: { fields: "*" }
       });
       setProducts(response.data);
     } catch (error) {
@@ -454,7 +457,7 @@ export default function Products() {
                 />
                 {formData.image && (
                   <div className="mt-2">
-                    <img src={formData.image} alt="Preview" className="h-24 w-24 object-cover rounded" />
+                    <img src={imageSrc(formData.image)} alt="Preview" className="h-24 w-24 object-cover rounded" />
                   </div>
                 )}
               </div>
@@ -481,7 +484,7 @@ export default function Products() {
                     <p className="text-sm text-gray-500">Kod: {product.code}</p>
                   </div>
                   {product.image && (
-                    <img src={product.image} alt={product.name} className="h-16 w-16 object-cover rounded ml-2" />
+                    <img src={imageSrc(product.image_thumbnail || product.image)} alt={product.name} className="h-16 w-16 object-cover rounded ml-2" />
                   )}
                 </div>
               </CardHeader>
@@ -545,7 +548,7 @@ export default function Products() {
                 <TableRow key={product.id} data-testid="product-row">
                   <TableCell>
                     {product.image && (
-                      <img src={product.image} alt={product.name} className="h-12 w-12 object-cover rounded" />
+                      <img src={imageSrc(product.image_thumbnail || product.image)} alt={product.name} className="h-12 w-12 object-cover rounded" />
                     )}
                   </TableCell>
                   <TableCell className="font-medium">{product.name}</TableCell>
@@ -1,5 +1,6 @@
 import { useState, useEffect } from "react";
 import axios from "axios";
+import { imageSrc } from "@/lib/utils";
 import { Button } from "@/components/ui/button";
 import { Input } from "@/components/ui/input";
 import { Label } from "@/components/ui/label";
@@ -217,7 +218,7 @@ export default function Quotes() {
       product_id: product.id,
       product_name: product.name,
       product_code: product.code,
-      product_image: product.image,
+      product_image: product.image_thumbnail || product.image,
       unit: product.unit,
       quantity: calculatedQuantity,
       display_text: displayText,
@@ -612,7 +613,7 @@ export default function Quotes() {
                           <TableCell>
                             <div className="flex items-center gap-2">
                               {item.product_image && (
-                                <img src={item.product_image} alt={item.product_name} className="h-8 w-8 object-cover rounded" />
+                                <img src={imageSrc(item.product_image)} alt={item.product_name} className="h-8 w-8 object-cover rounded" />
                               )}
                               <div>
                                 <div className="font-medium">{item.product_name}</div>
@@ -24,12 +24,14 @@ export default function Reminders() {
   useEffect(() => {
     fetchReminders();
     
-    // Check for due reminders every 30 seconds
-    const interval = setInterval(() => {
-      checkDueReminders();
-    }, 30000);
+    // The server pushes each reminder as it comes due
+    const token = localStorage.getItem('token');
+    const source = new EventSource(`${API}/reminders/stream?token=${encodeURIComponent(token)}`);
+    source.addEventListener("reminder", (event) => {
+      notifyDueReminder(JSON.parse(event.data));
+    });
 
-    return () => clearInterval(interval);
+    return () => source.close();
   }, []);
 
   const fetchReminders = async () => {
@@ -44,41 +46,20 @@ export default function Reminders() {
     }
   };
 
-  const checkDueReminders = async () => {
-    const now = new Date();
-    const token = localStorage.getItem('token');
-    
-    try {
-      const response = await axios.get(`${API}/reminders`, {
-        headers: { Authorization: `Bearer ${token}` }
-      });
-      
-      response.data.forEach(reminder => {
-        if (!reminder.is_completed) {
-          const reminderDate = new Date(reminder.reminder_datetime);
-          const diffMinutes = (now - reminderDate) / 1000 / 60;
-          
-          // If reminder is due (within 1 minute of the time)
-          if (diffMinutes >= 0 && diffMinutes <= 1) {
-            // Show browser notification
-            if (Notification.permission === "granted") {
-              new Notification("🔔 Hatırlatma!", {
-                body: reminder.title,
-                icon: "/logo.png"
-              });
-            }
-            
-            // Show toast
-            toast.info(`🔔 ${reminder.title}`, {
-              description: reminder.description,
-              duration: 10000
-            });
-          }
-        }
+  const notifyDueReminder = (reminder) => {
+    // Show browser notification
+    if ("Notification" in window && Notification.permission === "granted") {
+      new Notification("🔔 Hatırlatma!", {
+        body: reminder.title,
+        icon: "/logo.png"
       });
-    } catch (error) {
-      console.error("Hatırlatma kontrolü başarısız", error);
     }
+    
+    // Show toast
+    toast.info(`🔔 ${reminder.title}`, {
+      description: reminder.description,
+      duration: 10000
+    });
   };
 
   const requestNotificationPermission = () => {
@@ -96,7 +77,9 @@ export default function Reminders() {
     const token = localStorage.getItem('token');
 
     try {
-      await axios.post(`${API}/reminders`, formData, {
+      // datetime-local values carry no offset; send the instant in UTC
+      const payload = { ...formData, reminder_datetime: new Date(formData.reminder_datetime).toISOString() };
+      await axios.post(`${API}/reminders`, payload, {
         headers: { Authorization: `Bearer ${token}` }
       });
       toast.success("Hatırlatma eklendi");